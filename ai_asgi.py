@@ -0,0 +1,308 @@
+# ai_asgi.py
+# pip install httpx uvicorn
+
+# 千问代理的原生异步(ASGI)实现，与 ai.py 中的Flask应用共用请求转换逻辑和token池。
+# /v1/chat/completions 在事件循环中处理，流式回答不占用线程，客户端断开时立即中止上游请求；
+# 其他接口转交给Flask应用处理。
+# 独立运行: python ai_asgi.py 或 uvicorn ai_asgi:app --host 0.0.0.0 --port 58888
+
+import io
+import sys
+import json
+import socket
+import asyncio
+import threading
+
+try:
+    import httpx
+    import uvicorn
+    ASGI_AVAILABLE = True
+except ImportError:
+    ASGI_AVAILABLE = False
+
+from ai import (
+    app as flask_app, token_pool, normalize_openai_request, debug_print, QwenSimpleClient,
+    PORT, SERVER_KEEPALIVE_TIMEOUT
+)
+
+UPSTREAM_READ_TIMEOUT = 300  # 等待上游下一段回答的最长时间(秒)，模型长时间思考时不能太短
+
+# 每个token一个异步客户端，只在服务的事件循环中创建和使用
+_async_sessions = {}
+
+
+def _get_async_session(client: QwenSimpleClient):
+    session = _async_sessions.get(client.auth_token)
+    if session is None:
+        async def on_response(response):
+            # 与同步会话一样统计上游错误，限流或鉴权失败时让token进入冷却
+            token_pool.record_response(client, response)
+
+        session = httpx.AsyncClient(
+            headers=dict(client.session.headers),
+            timeout=httpx.Timeout(10.0, read=UPSTREAM_READ_TIMEOUT),
+            event_hooks={"response": [on_response]}
+        )
+        _async_sessions[client.auth_token] = session
+    return session
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return body
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+async def _wait_disconnect(receive):
+    """等待客户端断开连接"""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _send_json(send, status: int, data: dict):
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _error(message: str, error_type: str = "server_error") -> dict:
+    return {"error": { "message": message, "type": error_type, "param": None, "code": None }}
+
+
+async def _stream_completion(client: QwenSimpleClient, completion: dict, receive, send):
+    """流式转发回答，客户端断开时取消上游请求"""
+    model, chat_id = completion["model"], completion["chat_id"]
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no")
+        ]
+    })
+
+    async def pump() -> bool:
+        """转发上游回答，返回客户端是否仍在连接"""
+        try:
+            async with _get_async_session(client).stream(
+                "POST", completion["url"], json=completion["payload"], headers=completion["headers"]
+            ) as r:
+                r.raise_for_status()
+                state = {"finish_reason": "stop", "done": False}
+                async for line in r.aiter_lines():
+                    # 等待客户端接收后再读取下一行，客户端慢时上游也随之放慢
+                    for event in QwenSimpleClient.translate_stream_line(line, model, chat_id, state):
+                        await send({"type": "http.response.body", "body": event.encode("utf-8"), "more_body": True})
+                    if state["done"]:
+                        break
+            return True
+        except Exception as e:
+            # 与Flask实现一致，任何错误都以错误事件告知客户端；客户端已断开时发送也会失败
+            debug_print(f"流式请求失败: {e}")
+            try:
+                await send({
+                    "type": "http.response.body",
+                    "body": QwenSimpleClient.stream_error_event(model, e).encode("utf-8"),
+                    "more_body": True
+                })
+                return True
+            except Exception:
+                return False
+
+    pump_task = asyncio.ensure_future(pump())
+    disconnect_task = asyncio.ensure_future(_wait_disconnect(receive))
+    done, _ = await asyncio.wait({pump_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+
+    if disconnect_task in done:
+        # 取消后退出stream上下文，上游连接随之关闭
+        pump_task.cancel()
+        debug_print(f"客户端已断开，中止上游请求: {chat_id}")
+        try:
+            await pump_task
+        except asyncio.CancelledError:
+            pass
+        return
+
+    disconnect_task.cancel()
+    if pump_task.result():
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def _complete(client: QwenSimpleClient, completion: dict, send):
+    """非流式请求：读完上游回答后一次返回"""
+    state = QwenSimpleClient.new_completion_state()
+    try:
+        async with _get_async_session(client).stream(
+            "POST", completion["url"], json=completion["payload"], headers=completion["headers"]
+        ) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if QwenSimpleClient.accumulate_line(line, state):
+                    break
+        response = QwenSimpleClient.build_completion_response(completion["model"], completion["chat_id"], state)
+    except Exception as e:
+        # 与Flask实现一致，任何错误都返回500
+        debug_print(f"聊天补全失败: {e}")
+        await _send_json(send, 500, _error(f"内部服务器错误: {str(e)}"))
+        return
+    await _send_json(send, 200, response)
+
+
+async def chat_completions(scope, receive, send):
+    try:
+        openai_request = json.loads(await _read_body(receive) or b"null")
+    except ValueError:
+        openai_request = None
+    if not openai_request:
+        await _send_json(send, 400, _error("请求体中 JSON 无效", "invalid_request_error"))
+        return
+
+    normalize_openai_request(openai_request)
+
+    client = token_pool.acquire()
+    try:
+        # 上传图片和分配对话可能需要同步请求上游，放到线程中进行，不阻塞事件循环
+        completion = await asyncio.to_thread(client.prepare_completion, openai_request)
+    except Exception as e:
+        token_pool.release(client)
+        debug_print(f"处理聊天补全请求时发生未预期错误: {e}")
+        await _send_json(send, 500, _error(f"内部服务器错误: {str(e)}"))
+        return
+
+    try:
+        if completion["stream"]:
+            await _stream_completion(client, completion, receive, send)
+        else:
+            await _complete(client, completion, send)
+    finally:
+        client.chat_deleter.delete(completion["chat_id"])
+        token_pool.release(client)
+
+
+def _call_flask(scope, body: bytes) -> tuple:
+    """在线程中以WSGI方式调用Flask应用，返回 (状态码, 响应头, 响应体)"""
+    server_name, server_port = scope.get("server") or ("127.0.0.1", PORT)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif key != "CONTENT_LENGTH":
+            key = f"HTTP_{key}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+    result = flask_app(environ, start_response)
+    try:
+        response_body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return response["status"], response["headers"], response_body
+
+
+async def app(scope, receive, send):
+    """ASGI入口"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for session in list(_async_sessions.values()):
+                    await session.aclose()
+                _async_sessions.clear()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+
+    if scope["path"] == "/v1/chat/completions" and scope["method"] == "POST":
+        await chat_completions(scope, receive, send)
+        return
+
+    # 其他接口都是短请求，交给Flask应用处理
+    body = await _read_body(receive)
+    status, headers, response_body = await asyncio.to_thread(_call_flask, scope, body)
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": response_body})
+
+
+class AsgiProxyServer:
+    """ASGI模式的代理服务，使用uvicorn，接口与 ai.ProxyServer 一致
+
+    单个事件循环处理所有流式回答，同时打开的流不受线程数限制。
+    构造时即绑定端口；serve_forever() 可在后台线程中运行，shutdown() 等待进行中的请求结束后退出。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = PORT, keepalive_timeout: int = SERVER_KEEPALIVE_TIMEOUT,
+                 shutdown_timeout: int = 5):
+        self.host = host
+        self.port = port
+        self.backend = "uvicorn"
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self._server = uvicorn.Server(uvicorn.Config(
+            app, timeout_keep_alive=keepalive_timeout, timeout_graceful_shutdown=shutdown_timeout,
+            lifespan="on", log_level="warning"
+        ))
+        self._stopped = threading.Event()
+
+    def serve_forever(self):
+        """运行服务直到shutdown"""
+        print(f"代理服务已启动: http://{self.host}:{self.port} ({self.backend}, ASGI)")
+        try:
+            self._server.run(sockets=[self._socket])
+        finally:
+            self._stopped.set()
+
+    def shutdown(self, timeout: float = 5):
+        """停止服务：不再接受新连接，等待进行中的请求结束"""
+        self._server.should_exit = True
+        self._stopped.wait(timeout + 1)
+        token_pool.drain_chats(timeout)
+        print("代理服务已停止")
+
+
+if __name__ == '__main__':
+    if not ASGI_AVAILABLE:
+        print("ASGI模式需要安装 httpx 和 uvicorn: pip install httpx uvicorn")
+        sys.exit(1)
+    print(f"正在以ASGI模式启动服务器于端口 {PORT}...")
+    AsgiProxyServer(host='0.0.0.0', port=PORT).serve_forever()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI截图分析异步HTTP模块
+在独立线程的asyncio事件循环中发送请求，同一端点的并发请求复用HTTP/2连接
+"""
+
+import asyncio
+import logging
+import threading
+import importlib.util
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import Any, Coroutine, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+# HTTP/2需要额外安装h2，未安装时退回HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+from util import CancellationToken, TaskCancelledError
+
+ENGINES = ("requests", "asyncio")
+
+
+def use_async_engine(network_config: Optional[Dict[str, Any]]) -> bool:
+    """是否按配置使用asyncio引擎，未安装httpx时回退到requests引擎"""
+    if (network_config or {}).get("engine", "requests") != "asyncio":
+        return False
+    if not HTTPX_AVAILABLE:
+        logging.warning("asyncio网络引擎需要安装 httpx，已回退到requests引擎")
+        return False
+    return True
+
+
+class AsyncHttpEngine:
+    """asyncio网络引擎（进程级单例）
+
+    事件循环在后台线程中常驻，与Qt事件循环并行；所有请求共用一个httpx客户端，
+    同一端点的并发请求在HTTP/2连接上多路复用，无需每个请求占用一个线程。
+    协程通过 submit() 提交，返回 concurrent.futures.Future。
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client = None
+        self._in_flight: Dict[Any, int] = {}  # 各客户端上进行中的请求数
+        self._retired = []  # 配置变化后被替换、等待进行中请求结束再关闭的客户端
+        self._lock = threading.Lock()
+        self.pool_maxsize = 16
+        self.http2 = True
+
+    @classmethod
+    def instance(cls) -> "AsyncHttpEngine":
+        """获取全局唯一实例"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def configure(self, network_config: Optional[Dict[str, Any]]):
+        """根据网络配置调整连接数和HTTP/2开关，配置变化时后续请求使用新客户端"""
+        network_config = network_config or {}
+        pool_maxsize = int(network_config.get("pool_maxsize", self.pool_maxsize))
+        http2 = bool(network_config.get("http2", self.http2))
+
+        if pool_maxsize == self.pool_maxsize and http2 == self.http2:
+            return
+
+        self.pool_maxsize = pool_maxsize
+        self.http2 = http2
+        if self._loop is not None:
+            self.submit(self._retire_client())
+        logging.info(f"asyncio网络引擎已配置: pool_maxsize={pool_maxsize}, http2={http2 and HTTP2_AVAILABLE}")
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """获取事件循环，首次使用时在后台线程中启动"""
+        with self._lock:
+            if self._loop is None:
+                if not HTTPX_AVAILABLE:
+                    raise RuntimeError("asyncio网络引擎需要安装 httpx")
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="async-http", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _get_client(self):
+        """获取httpx客户端，只能在事件循环线程中调用"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self.http2 and HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize)
+            )
+        return self._client
+
+    async def _close_client(self):
+        """关闭httpx客户端，下次请求时重建"""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+        retired, self._retired = self._retired, []
+        for client in retired:
+            await client.aclose()
+
+    async def _retire_client(self):
+        """替换httpx客户端：下次请求时按新配置重建，旧客户端等进行中的请求结束后再关闭"""
+        client, self._client = self._client, None
+        if client is None:
+            return
+        if self._in_flight.get(client):
+            self._retired.append(client)
+        else:
+            await client.aclose()
+
+    @asynccontextmanager
+    async def _use_client(self):
+        """使用当前客户端发送一个请求，记录进行中的请求数"""
+        client = self._get_client()
+        self._in_flight[client] = self._in_flight.get(client, 0) + 1
+        try:
+            yield client
+        finally:
+            self._in_flight[client] -= 1
+            if not self._in_flight[client]:
+                del self._in_flight[client]
+                if client in self._retired:
+                    self._retired.remove(client)
+                    await client.aclose()
+
+    def submit(self, coro: Coroutine, cancel_token: Optional[CancellationToken] = None) -> Future:
+        """把协程提交到事件循环，可在任意线程中调用
+
+        cancel_token 被取消时协程被取消，Future以TaskCancelledError结束。
+        """
+        return asyncio.run_coroutine_threadsafe(self._run(coro, cancel_token), self._get_loop())
+
+    async def _run(self, coro: Coroutine, cancel_token: Optional[CancellationToken]):
+        """执行协程，令牌取消时取消当前任务"""
+        if cancel_token is None:
+            return await coro
+
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        callback = lambda: loop.call_soon_threadsafe(task.cancel)
+        cancel_token.add_callback(callback)
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            if cancel_token.cancelled:
+                raise TaskCancelledError("任务已取消")
+            raise
+        finally:
+            cancel_token.remove_callback(callback)
+
+    async def request(self, method: str, url: str, **kwargs):
+        """发送请求并读取完整响应体"""
+        async with self._use_client() as client:
+            return await client.request(method, url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """发送流式请求，返回异步上下文管理器，响应体在读取时才从连接上接收"""
+        async with self._use_client() as client:
+            async with client.stream(method, url, **kwargs) as response:
+                yield response
+
+    def request_sync(self, method: str, url: str, cancel_token: Optional[CancellationToken] = None,
+                     **kwargs):
+        """在工作线程中同步发送请求，不能在事件循环线程中调用"""
+        return self.submit(self.request(method, url, **kwargs), cancel_token).result()
+
+    def get(self, url: str, **kwargs):
+        """同步发送GET请求"""
+        return self.request_sync("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        """同步发送POST请求"""
+        return self.request_sync("POST", url, **kwargs)
+
+    def prewarm(self, urls: Iterable[str], timeout: float = 5):
+        """预先建立到各端点的连接，不阻塞调用方"""
+        endpoints = []
+        for url in urls:
+            if url and url.startswith(("http://", "https://")):
+                parsed = urlparse(url)
+                endpoint = f"{parsed.scheme}://{parsed.netloc}"
+                if endpoint not in endpoints:
+                    endpoints.append(endpoint)
+
+        async def warm(endpoint):
+            try:
+                await self.request("HEAD", endpoint + "/", timeout=timeout)
+                logging.debug(f"连接预热成功: {endpoint}")
+            except httpx.HTTPError as e:
+                logging.debug(f"连接预热失败: {endpoint}: {e}")
+
+        for endpoint in endpoints:
+            self.submit(warm(endpoint))
+
+    def close(self):
+        """关闭客户端并停止事件循环"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_client(), loop).result(timeout=2)
+        except Exception as e:
+            logging.debug(f"关闭asyncio网络引擎失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
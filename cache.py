@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI截图分析缓存模块
+包含OCR结果磁盘缓存、近似截图索引、AI回答缓存等功能
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from imaging import hamming_distance
+
+
+class OCRResultCache:
+    """OCR结果磁盘缓存
+
+    以图片像素内容的哈希加上引擎及其配置作为键，每个引擎单独一个子目录。
+    每条结果一个文件，文件修改时间即最近使用时间，超出条数或容量时按LRU淘汰。
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 500, max_size_mb: float = 50):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(image_digest: str, engine: str, engine_config: Optional[Dict[str, Any]] = None) -> str:
+        """根据图片哈希、引擎和引擎配置生成缓存键"""
+        config_text = json.dumps(engine_config or {}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(f"{image_digest}|{engine}|{config_text}".encode('utf-8')).hexdigest()
+
+    def _entry_path(self, engine: str, key: str) -> str:
+        """获取缓存条目文件路径"""
+        return os.path.join(self.cache_dir, engine, f"{key}.json")
+
+    def get(self, engine: str, key: str) -> Optional[str]:
+        """读取缓存，命中时刷新最近使用时间"""
+        path = self._entry_path(engine, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path, None)
+            return entry.get("text")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"读取OCR缓存失败，已忽略: {e}")
+            return None
+
+    def put(self, engine: str, key: str, text: str):
+        """写入缓存并按需淘汰旧条目"""
+        path = self._entry_path(engine, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"engine": engine, "text": text, "created_at": int(time.time())}, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logging.warning(f"写入OCR缓存失败: {e}")
+            return
+
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        """按最近使用时间淘汰超出条数或容量限制的条目"""
+        entries = []
+        total_bytes = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_bytes += stat.st_size
+
+        if len(entries) <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if len(entries) - removed <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+                total_bytes -= size
+            except OSError:
+                continue
+
+        logging.debug(f"OCR缓存淘汰 {removed} 条")
+
+    def clear(self):
+        """清空全部缓存"""
+        with self._lock:
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if name.endswith(".json"):
+                        try:
+                            os.remove(os.path.join(root, name))
+                        except OSError:
+                            pass
+
+
+class PerceptualHashIndex:
+    """近似截图索引
+
+    以感知哈希记录历史截图的OCR文字和AI回答。新截图与历史截图的汉明距离
+    不超过阈值、且尺寸相近时视为同一内容，可直接复用之前的结果。
+    """
+
+    # 尺寸允许的相对误差，避免内容布局相似但大小不同的截图被误判
+    SIZE_TOLERANCE = 0.05
+
+    def __init__(self, index_file: str, max_entries: int = 200, threshold: int = 3):
+        self.index_file = index_file
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries: Optional[List[Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_answer_key(model_id: str, prompt: str) -> str:
+        """生成AI回答的键（模型+提示词）"""
+        return hashlib.sha256(f"{model_id}|{prompt}".encode('utf-8')).hexdigest()
+
+    def _load(self) -> List[Dict[str, Any]]:
+        """首次使用时从磁盘加载索引"""
+        if self._entries is None:
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = []
+            except (OSError, ValueError) as e:
+                logging.warning(f"读取近似截图索引失败，已重建: {e}")
+                self._entries = []
+        return self._entries
+
+    def _save(self):
+        """保存索引到磁盘"""
+        try:
+            os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+            temp_path = f"{self.index_file}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_file)
+        except OSError as e:
+            logging.warning(f"保存近似截图索引失败: {e}")
+
+    def _size_matches(self, entry: Dict[str, Any], size: Tuple[int, int]) -> bool:
+        """判断尺寸是否相近"""
+        width, height = entry.get("size", (0, 0))
+        return (abs(width - size[0]) <= max(width, size[0]) * self.SIZE_TOLERANCE
+                and abs(height - size[1]) <= max(height, size[1]) * self.SIZE_TOLERANCE)
+
+    def _find_entry(self, phash: int, size: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+        """查找距离最近且在阈值内的条目"""
+        best, best_distance = None, self.threshold + 1
+        for entry in self._load():
+            if not self._size_matches(entry, size):
+                continue
+            distance = hamming_distance(int(entry["hash"], 16), phash)
+            if distance < best_distance:
+                best, best_distance = entry, distance
+        return best
+
+    def find(self, phash: int, size: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+        """查找近似截图，返回条目副本（含ocr_text和answers）"""
+        with self._lock:
+            entry = self._find_entry(phash, size)
+            if entry is None:
+                return None
+            return {"ocr_text": entry.get("ocr_text"), "answers": dict(entry.get("answers", {}))}
+
+    def _upsert(self, phash: int, size: Tuple[int, int]) -> Dict[str, Any]:
+        """获取或创建条目，并移到最近使用的位置"""
+        entries = self._load()
+        entry = self._find_entry(phash, size)
+        if entry is None:
+            entry = {"hash": f"{phash:016x}", "size": list(size), "ocr_text": None, "answers": {}}
+        else:
+            entries.remove(entry)
+        entry["last_used"] = int(time.time())
+        entries.append(entry)
+        del entries[:-self.max_entries]
+        return entry
+
+    def add_ocr_text(self, phash: int, size: Tuple[int, int], ocr_text: str):
+        """记录OCR文字"""
+        with self._lock:
+            self._upsert(phash, size)["ocr_text"] = ocr_text
+            self._save()
+
+    def add_answer(self, phash: int, size: Tuple[int, int], answer_key: str, answer: str):
+        """记录AI回答"""
+        with self._lock:
+            self._upsert(phash, size).setdefault("answers", {})[answer_key] = answer
+            self._save()
+
+
+class AIResponseCache:
+    """AI回答内存缓存
+
+    以模型、提示词、OCR文字/图片哈希和生成参数作为键，带过期时间和条目上限。
+    """
+
+    def __init__(self, max_entries: int = 100, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(ai_config: Dict[str, Any], prompt: str, ocr_text: Optional[str] = None,
+                 image_digest: Optional[str] = None) -> str:
+        """生成缓存键"""
+        key_data = {
+            "model_id": ai_config.get("model_id"),
+            "api_endpoint": ai_config.get("api_endpoint"),
+            "max_tokens": ai_config.get("max_tokens"),
+            "temperature": ai_config.get("temperature"),
+            "prompt": prompt,
+            "ocr_text": ocr_text,
+            "image": image_digest
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取未过期的回答，返回包含content和reasoning的字典"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, content: str, reasoning: str = ""):
+        """写入回答，超出上限时淘汰最久未使用的条目"""
+        with self._lock:
+            self._entries[key] = {"content": content, "reasoning": reasoning, "created_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
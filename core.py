@@ -7,23 +7,31 @@ AI截图分析核心功能模块
 
 import os
 import io
-import base64
+import asyncio
 import json
 import logging
 import smtplib
 import time
 import hashlib
 import hmac
+import statistics
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional
-import requests
+from typing import Optional, Tuple
 from PIL import Image, ImageGrab
-from PyQt6.QtCore import QObject, pyqtSignal, QThread, QTimer
+from PyQt6.QtCore import QObject, pyqtSignal, QTimer
 from pynput import keyboard
 
 from screenshot_overlay import AdvancedScreenshotManager
+from util import HttpClientManager, TaskExecutor, CancellationToken, TaskCancelledError
+from imaging import EncodedImage, ImageCompressor, split_into_tiles, preprocess_for_ocr
+from cache import OCRResultCache, AIResponseCache
+from local_ocr import LocalOCRPool
+from async_client import AsyncHttpEngine, use_async_engine
 
 
 class ScreenshotManager(QObject):
@@ -33,19 +41,19 @@ class ScreenshotManager(QObject):
     screenshot_failed = pyqtSignal(str)    # 截图失败信号
     screenshot_cancelled = pyqtSignal()    # 截图取消信号
     hotkey_triggered = pyqtSignal()        # 快捷键触发信号
+    selection_settled = pyqtSignal(object) # 选区稳定信号，可提前开始识别
+    selection_changed = pyqtSignal()       # 已稳定的选区被修改信号
     
     def __init__(self, config_manager):
         super().__init__()
         self.config_manager = config_manager
         self.advanced_manager = AdvancedScreenshotManager(config_manager)
         self.hotkey_listener = None
+        self.hotkey_time = None  # 最近一次快捷键触发时间，用于统计截图延迟
+        self.connected_overlay = None
         
         # 连接快捷键信号到截图方法
         self.hotkey_triggered.connect(self.start_screenshot)
-        
-        # 连接高级截图管理器信号
-        self.advanced_manager.overlay = None  # 初始化overlay属性
-        # 注意：信号连接需要在overlay创建后进行
     
     def setup_hotkey(self):
         """设置全局快捷键"""
@@ -58,6 +66,7 @@ class ScreenshotManager(QObject):
             
             def on_hotkey():
                 # 使用信号来避免在快捷键回调中直接调用UI操作
+                self.hotkey_time = time.perf_counter()
                 self.hotkey_triggered.emit()
             
             self.hotkey_listener = keyboard.GlobalHotKeys({
@@ -70,28 +79,23 @@ class ScreenshotManager(QObject):
         except Exception as e:
             logging.error(f"设置全局快捷键失败: {e}")
     
+    def prewarm_overlay(self):
+        """预创建截图覆盖层并连接信号，需在QApplication创建之后调用"""
+        overlay = self.advanced_manager.prewarm()
+        if overlay is not self.connected_overlay:
+            overlay.screenshot_confirmed.connect(self.on_screenshot_confirmed)
+            overlay.screenshot_cancelled.connect(self.on_screenshot_cancelled)
+            overlay.selection_settled.connect(self.selection_settled.emit)
+            overlay.selection_changed.connect(self.selection_changed.emit)
+            self.connected_overlay = overlay
+            logging.info("截图信号连接成功")
+    
     def start_screenshot(self):
         """开始截图"""
         try:
-            # 先断开之前的连接（如果存在）
-            if self.advanced_manager.overlay:
-                try:
-                    self.advanced_manager.overlay.screenshot_confirmed.disconnect()
-                    self.advanced_manager.overlay.screenshot_cancelled.disconnect()
-                except:
-                    pass
-            
-            # 启动截图
-            self.advanced_manager.start_screenshot()
-            
-            # 连接信号（在overlay创建后）
-            if self.advanced_manager.overlay:
-                self.advanced_manager.overlay.screenshot_confirmed.connect(self.on_screenshot_confirmed)
-                self.advanced_manager.overlay.screenshot_cancelled.connect(self.on_screenshot_cancelled)
-                logging.info("截图信号连接成功")
-            else:
-                logging.error("截图overlay创建失败")
-                self.screenshot_failed.emit("截图overlay创建失败")
+            trigger_time, self.hotkey_time = self.hotkey_time, None
+            self.prewarm_overlay()
+            self.advanced_manager.start_screenshot(trigger_time)
                 
         except Exception as e:
             logging.error(f"启动截图失败: {e}")
@@ -120,6 +124,8 @@ class ScreenshotManager(QObject):
         """清理资源"""
         if self.hotkey_listener:
             self.hotkey_listener.stop()
+        self.advanced_manager.cleanup()
+        self.connected_overlay = None
 
 
 class OCRManager(QObject):
@@ -128,33 +134,394 @@ class OCRManager(QObject):
     ocr_completed = pyqtSignal(str)  # OCR完成信号
     ocr_failed = pyqtSignal(str)  # OCR失败信号
     
+    ENGINES = ("tencent", "xinyew", "vision_model", "local")
+    NO_TEXT_RESULT = "未识别到文字内容"
+    
     def __init__(self, config_manager):
         super().__init__()
         self.config_manager = config_manager
+        self.http_client = HttpClientManager.instance()
+        self.image_compressor = ImageCompressor(config_manager)
+        self.ocr_cache = None
+        self.local_pool = None
+        self._speculative_image = None
+        self._speculative_future = None
+        self._speculative_token = None
+        self._engine_latencies = {engine: deque(maxlen=50) for engine in self.ENGINES}
+        self._latency_lock = threading.Lock()
     
-    def recognize_image(self, image: Image.Image) -> str:
-        """识别图片中的文字"""
-        try:
-            engine = self.config_manager.get_config("ocr.engine")
-            
+    def _get_http_client(self):
+        """按网络配置选择requests或asyncio引擎，两者的get/post接口一致"""
+        if use_async_engine(self.config_manager.get_config("network")):
+            return AsyncHttpEngine.instance()
+        return self.http_client
+    
+    def get_endpoints(self) -> list:
+        """获取当前OCR引擎会访问的端点，用于连接预热"""
+        engine = self.config_manager.get_config("ocr.engine")
+        engines = self._get_race_engines() if engine == "race" else [engine]
+        
+        endpoints = []
+        for engine in engines:
             if engine == "tencent":
-                return self._tencent_ocr(image)
-            elif engine == "xinyew":
-                return self._xinyew_ocr(image)
+                endpoints.append("https://ocr.tencentcloudapi.com/")
             elif engine == "vision_model":
-                return self._vision_model_ocr(image)
+                endpoints.append(self.config_manager.get_config("ocr.vision_model.api_endpoint"))
+            elif engine == "local":
+                continue
             else:
+                endpoints.extend(["https://api.xinyew.cn/api/360tc", "https://api.jkyai.top/API/ocrwzsb.php"])
+        return endpoints
+    
+    def prewarm_local_engine(self):
+        """当前配置用到本地OCR时，启动进程池并预加载模型"""
+        engine = self.config_manager.get_config("ocr.engine")
+        engines = self._get_race_engines() if engine == "race" else [engine]
+        local_config = self.config_manager.get_config("ocr.local") or {}
+        if "local" in engines and local_config.get("warmup", True):
+            self._get_local_pool().warmup()
+    
+    def _get_local_pool(self) -> LocalOCRPool:
+        """获取本地OCR进程池"""
+        workers = int(self.config_manager.get_config("ocr.local.workers") or 2)
+        if self.local_pool is None:
+            self.local_pool = LocalOCRPool(workers)
+        else:
+            self.local_pool.resize(workers)
+        return self.local_pool
+    
+    def start_speculative_recognition(self, image: Image.Image):
+        """在用户确认截图前提前开始识别，确认时若仍是同一张图片可直接取用结果"""
+        self.cancel_speculative_recognition()
+        self._speculative_image = image
+        self._speculative_token = CancellationToken()
+        self._speculative_future = TaskExecutor.instance().submit(
+            self.recognize_image, image, self._speculative_token
+        )
+        logging.info(f"选区已稳定，提前开始OCR识别 ({image.width}x{image.height})")
+    
+    def cancel_speculative_recognition(self):
+        """作废提前开始的识别，尚未开始的直接取消，已在进行的识别尽快中断"""
+        if self._speculative_future is not None:
+            if self._speculative_future.cancel():
+                logging.info("已取消提前开始的OCR识别")
+            self._speculative_future = None
+        if self._speculative_token is not None:
+            self._speculative_token.cancel()
+            self._speculative_token = None
+        self._speculative_image = None
+    
+    def take_speculative_recognition(self, image: Image.Image) -> Optional[Tuple[Future, CancellationToken]]:
+        """取出针对该图片提前开始的识别任务及其取消令牌，没有时返回None"""
+        future = self._speculative_future
+        if future is None or image is not self._speculative_image:
+            return None
+        token = self._speculative_token
+        self._speculative_future = None
+        self._speculative_token = None
+        self._speculative_image = None
+        return future, token
+    
+    def cleanup(self):
+        """清理资源"""
+        self.cancel_speculative_recognition()
+        if self.local_pool is not None:
+            self.local_pool.shutdown()
+    
+    def _get_ocr_cache(self) -> Optional[OCRResultCache]:
+        """获取OCR结果缓存，未启用时返回None"""
+        cache_config = self.config_manager.get_config("cache") or {}
+        if not cache_config.get("ocr_enabled", True):
+            return None
+        
+        cache_dir = os.path.join(cache_config.get("dir", "cache"), "ocr")
+        if self.ocr_cache is None or self.ocr_cache.cache_dir != cache_dir:
+            self.ocr_cache = OCRResultCache(cache_dir)
+        self.ocr_cache.max_entries = int(cache_config.get("ocr_max_entries", 500))
+        self.ocr_cache.max_bytes = int(float(cache_config.get("ocr_max_size_mb", 50)) * 1024 * 1024)
+        return self.ocr_cache
+    
+    def _get_engine_cache_config(self, engine: str) -> dict:
+        """获取影响识别结果的引擎配置，作为缓存键的一部分"""
+        engine_config = {
+            "quality": self.config_manager.get_config("screenshot.quality"),
+            "format": self.config_manager.get_config("screenshot.format")
+        }
+        engine_config["preprocess"] = self._get_preprocess_options(engine)
+        # 分块方式影响拼接结果
+        tiling_config = self.config_manager.get_config("ocr.tiling") or {}
+        engine_config["tiling"] = {
+            "enabled": tiling_config.get("enabled", True),
+            "max_tile_height": int(tiling_config.get("max_tile_height", 1600)),
+            "overlap": int(tiling_config.get("overlap", 64))
+        }
+        if engine == "tencent":
+            tencent_config = self.config_manager.get_config("ocr.tencent") or {}
+            engine_config["region"] = tencent_config.get("region")
+            engine_config["language"] = tencent_config.get("language")
+        elif engine == "vision_model":
+            vision_model = self.config_manager.get_config("ocr.vision_model") or {}
+            for key in ("model_id", "api_endpoint", "prompt", "max_image_pixels"):
+                engine_config[key] = vision_model.get(key)
+        elif engine == "local":
+            engine_config["model"] = "rapidocr"
+        elif engine == "race":
+            # 引擎顺序、对冲和置信度门槛决定采用哪个引擎的结果
+            race_config = self.config_manager.get_config("ocr.race") or {}
+            engine_config["engines"] = self._get_race_engines()
+            engine_config["hedged"] = bool(race_config.get("hedged", False))
+            engine_config["min_confidence"] = float(race_config.get("min_confidence", 0))
+            for race_engine in self._get_race_engines():
+                engine_config[race_engine] = self._get_engine_cache_config(race_engine)
+        return engine_config
+    
+    def recognize_image(self, image: Image.Image, cancel_token: Optional[CancellationToken] = None) -> str:
+        """识别图片中的文字，cancel_token 被取消后尽快抛出TaskCancelledError"""
+        try:
+            engine = self.config_manager.get_config("ocr.engine")
+            if engine not in self.ENGINES and engine != "race":
                 # 默认使用新野OCR
-                return self._xinyew_ocr(image)
-                
+                engine = "xinyew"
+            
+            # 先查询缓存，相同截图无需再次请求网络
+            ocr_cache = self._get_ocr_cache()
+            cache_key = None
+            if ocr_cache:
+                cache_key = OCRResultCache.make_key(
+                    EncodedImage.of(image).get_pixel_digest(), engine, self._get_engine_cache_config(engine)
+                )
+                cached_text = ocr_cache.get(engine, cache_key)
+                if cached_text is not None:
+                    logging.info(f"OCR缓存命中 ({engine})，跳过网络请求")
+                    return cached_text
+            
+            ocr_text = self._recognize_tiled(engine, image, cancel_token)
+            
+            if ocr_cache and ocr_text.strip() and ocr_text != self.NO_TEXT_RESULT:
+                ocr_cache.put(engine, cache_key, ocr_text)
+            
+            return ocr_text
+        
+        except TaskCancelledError:
+            logging.info("OCR识别已取消")
+            raise
         except Exception as e:
             error_msg = f"OCR识别失败: {e}"
             logging.error(error_msg)
-            # 在WorkerThread中不发射信号，直接抛出异常
+            # 在任务执行器中不发射信号，直接抛出异常
             raise Exception(error_msg)
     
+    def _recognize_tiled(self, engine: str, image: Image.Image,
+                         cancel_token: Optional[CancellationToken] = None) -> str:
+        """过高的截图切成横条后并发识别，再按阅读顺序拼接"""
+        tiling_config = self.config_manager.get_config("ocr.tiling") or {}
+        if not tiling_config.get("enabled", True):
+            return self._recognize_with_engine(engine, image, cancel_token)
+        
+        tiles = split_into_tiles(
+            image,
+            max(200, int(tiling_config.get("max_tile_height", 1600))),
+            int(tiling_config.get("overlap", 64))
+        )
+        if len(tiles) == 1:
+            return self._recognize_with_engine(engine, image, cancel_token)
+        
+        logging.info(f"截图高度 {image.height}px，切分为 {len(tiles)} 块并发识别")
+        workers = max(1, min(len(tiles), int(tiling_config.get("workers", 4))))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-tile")
+        # 某一块失败或任务被取消时取消子令牌，中断其余仍在识别的块
+        with CancellationToken.child_of(cancel_token) as tile_token:
+            try:
+                futures = [
+                    executor.submit(
+                        self._recognize_with_engine, engine, image.crop((0, top, image.width, bottom)), tile_token
+                    )
+                    for top, bottom, _ in tiles
+                ]
+                texts = [future.result() for future in futures]
+            finally:
+                # 不再等待其余块，尚未开始的直接取消
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        return self._stitch_tile_texts(texts, [overlapped for _, _, overlapped in tiles])
+    
+    def _stitch_tile_texts(self, texts: list, overlaps: list) -> str:
+        """拼接分块识别结果，去掉重叠区域重复识别出的行"""
+        lines = []
+        for text, overlapped in zip(texts, overlaps):
+            if not text or text == self.NO_TEXT_RESULT:
+                continue
+            tile_lines = text.splitlines()
+            
+            if overlapped and lines:
+                # 上一块末尾与这一块开头相同的行即为重叠区域，只保留一份
+                normalized_tail = [" ".join(line.split()) for line in lines[-5:]]
+                normalized_head = [" ".join(line.split()) for line in tile_lines[:5]]
+                for count in range(min(len(normalized_tail), len(normalized_head)), 0, -1):
+                    if normalized_tail[-count:] == normalized_head[:count]:
+                        tile_lines = tile_lines[count:]
+                        break
+            
+            lines.extend(tile_lines)
+        
+        return "\n".join(lines) if lines else self.NO_TEXT_RESULT
+    
+    def _recognize_with_engine(self, engine: str, image: Image.Image,
+                               cancel_token: Optional[CancellationToken] = None) -> str:
+        """使用指定引擎识别"""
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        if engine == "race":
+            race_config = self.config_manager.get_config("ocr.race") or {}
+            hedge_delay = self._get_hedge_delay(race_config) if race_config.get("hedged", False) else None
+            return self._race_engines(
+                self._get_race_engines(), image, hedge_delay, float(race_config.get("min_confidence", 0)),
+                cancel_token
+            )
+        return self._run_engine(engine, image, cancel_token)[0]
+    
+    def _get_preprocess_options(self, engine: str) -> Optional[dict]:
+        """获取指定引擎的预处理参数，该引擎不做预处理时返回None"""
+        preprocess_config = self.config_manager.get_config("ocr.preprocess") or {}
+        if not preprocess_config.get("enabled", True) or engine not in preprocess_config.get("engines", self.ENGINES):
+            return None
+        return {
+            "trim": preprocess_config.get("trim", True),
+            "invert_dark": preprocess_config.get("invert_dark", True),
+            "binarize": engine in preprocess_config.get("binarize_engines", []),
+            "upscale_below": int(preprocess_config.get("upscale_below", 0))
+        }
+    
+    def _run_engine(self, engine: str, image: Image.Image,
+                    cancel_token: Optional[CancellationToken] = None) -> tuple:
+        """运行单个引擎并记录耗时，返回 (文字, 置信度)，引擎不提供置信度时为None"""
+        start_time = time.perf_counter()
+        preprocess_options = self._get_preprocess_options(engine)
+        if preprocess_options:
+            image = preprocess_for_ocr(image, **preprocess_options)
+        
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        if engine == "local":
+            result = self._local_ocr(image, cancel_token)
+        else:
+            # 分块和竞速会在一个任务内并发调用多个引擎，外发请求共用任务执行器的 max_workers 额度
+            with TaskExecutor.instance().outbound_slot(cancel_token):
+                if engine == "tencent":
+                    result = self._tencent_ocr_detailed(image, cancel_token)
+                elif engine == "vision_model":
+                    result = (self._vision_model_ocr(image, cancel_token), None)
+                else:
+                    result = (self._xinyew_ocr(image, cancel_token), None)
+        
+        with self._latency_lock:
+            self._engine_latencies.setdefault(engine, deque(maxlen=50)).append(time.perf_counter() - start_time)
+        return result
+    
+    def _get_race_engines(self) -> list:
+        """获取竞速模式下参与的引擎"""
+        race_config = self.config_manager.get_config("ocr.race") or {}
+        engines = [engine for engine in race_config.get("engines", []) if engine in self.ENGINES]
+        return engines or ["vision_model", "xinyew"]
+    
+    def _get_hedge_delay(self, race_config: dict) -> float:
+        """获取对冲延迟（秒）：未指定时使用首个引擎历史耗时的中位数"""
+        hedge_delay_ms = float(race_config.get("hedge_delay_ms", 0))
+        if hedge_delay_ms > 0:
+            return hedge_delay_ms / 1000
+        
+        first_engine = self._get_race_engines()[0]
+        with self._latency_lock:
+            latencies = list(self._engine_latencies.get(first_engine, []))
+        if not latencies:
+            return 3.0
+        return statistics.median(latencies)
+    
+    def _passes_quality_check(self, text: str, confidence: Optional[float], min_confidence: float) -> bool:
+        """检查识别结果：非空，且置信度（如果引擎提供）不低于阈值"""
+        if not text or not text.strip() or text == self.NO_TEXT_RESULT:
+            return False
+        if confidence is not None and confidence < min_confidence:
+            return False
+        return True
+    
+    def _race_engines(self, engines: list, image: Image.Image, hedge_delay: Optional[float] = None,
+                      min_confidence: float = 0, cancel_token: Optional[CancellationToken] = None) -> str:
+        """多个引擎竞速识别，返回第一个通过质量检查的结果
+
+        hedge_delay 为None时所有引擎同时启动；否则先启动首个引擎，
+        超过延迟仍未得到合格结果时再启动其余引擎。
+        """
+        executor = ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix="ocr-race")
+        futures = {}
+        errors = []
+        
+        def launch(engine_list):
+            for engine in engine_list:
+                futures[executor.submit(self._run_engine, engine, image, race_token)] = engine
+        
+        # 竞速结束时取消子令牌，中断仍在进行的落后引擎
+        with CancellationToken.child_of(cancel_token) as race_token:
+            try:
+                if hedge_delay is None:
+                    launch(engines)
+                    waiting_engines = []
+                else:
+                    launch(engines[:1])
+                    waiting_engines = engines[1:]
+                
+                while futures:
+                    timeout = hedge_delay if waiting_engines else None
+                    done, _ = wait(list(futures), timeout=timeout, return_when=FIRST_COMPLETED)
+                    
+                    if not done:
+                        # 首个引擎超过对冲延迟仍未返回，启动其余引擎
+                        logging.info(f"OCR对冲: {hedge_delay:.2f}s 内未返回，启动 {', '.join(waiting_engines)}")
+                        launch(waiting_engines)
+                        waiting_engines = []
+                        continue
+                    
+                    for future in done:
+                        engine = futures.pop(future)
+                        try:
+                            text, confidence = future.result()
+                        except TaskCancelledError:
+                            raise
+                        except Exception as e:
+                            errors.append(f"{engine}: {e}")
+                            continue
+                        
+                        if self._passes_quality_check(text, confidence, min_confidence):
+                            logging.info(f"OCR竞速完成，采用 {engine} 的结果")
+                            return text
+                        errors.append(f"{engine}: 结果未通过质量检查")
+                    
+                    # 已完成的引擎都不合格，立即启动尚未启动的引擎
+                    if waiting_engines:
+                        launch(waiting_engines)
+                        waiting_engines = []
+                
+                raise Exception("所有OCR引擎均未返回有效结果: " + "; ".join(errors))
+            
+            finally:
+                # 不等待落后的引擎，尚未开始的直接取消
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _local_ocr(self, image: Image.Image, cancel_token: Optional[CancellationToken] = None) -> tuple:
+        """本地OCR，返回 (文字, 平均置信度)"""
+        timeout = float(self.config_manager.get_config("ocr.local.timeout") or 30)
+        text, confidence = self._get_local_pool().recognize(image, timeout=timeout, cancel_token=cancel_token)
+        if not text.strip():
+            return self.NO_TEXT_RESULT, confidence
+        logging.info(f"本地OCR识别成功，识别到 {len(text)} 个字符")
+        return text, confidence
+    
     def _tencent_ocr(self, image: Image.Image) -> str:
         """腾讯云OCR"""
+        return self._tencent_ocr_detailed(image)[0]
+    
+    def _tencent_ocr_detailed(self, image: Image.Image, cancel_token: Optional[CancellationToken] = None) -> tuple:
+        """腾讯云OCR，返回 (文字, 平均置信度)"""
         try:
             # 获取配置
             secret_id = self.config_manager.get_config("ocr.tencent.secret_id")
@@ -163,10 +530,8 @@ class OCRManager(QObject):
             if not secret_id or not secret_key:
                 raise ValueError("腾讯云OCR配置不完整")
             
-            # 将图片转换为base64
-            buffer = io.BytesIO()
-            image.save(buffer, format='PNG')
-            image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            # 压缩并转换为base64（腾讯云OCR仅支持PNG/JPG）
+            image_base64 = self.image_compressor.prepare(image, allowed_formats=("PNG", "JPEG")).get_base64()
             
             # 构建请求
             url = "https://ocr.tencentcloudapi.com/"
@@ -190,17 +555,24 @@ class OCRManager(QObject):
             headers["Authorization"] = signature
             
             # 发送请求
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
+            response = self._get_http_client().post(url, headers=headers, json=payload, timeout=10,
+                                                    cancel_token=cancel_token)
             response.raise_for_status()
             
             result = response.json()
             if "Response" in result and "TextDetections" in result["Response"]:
-                texts = [item["DetectedText"] for item in result["Response"]["TextDetections"]]
+                detections = result["Response"]["TextDetections"]
+                texts = [item["DetectedText"] for item in detections]
                 ocr_text = "\n".join(texts)
-                return ocr_text
+                # 腾讯云置信度范围为0-100
+                confidences = [item.get("Confidence", 100) for item in detections]
+                confidence = sum(confidences) / len(confidences) / 100 if confidences else None
+                return ocr_text, confidence
             else:
                 raise ValueError("OCR响应格式错误")
-                
+        
+        except TaskCancelledError:
+            raise
         except Exception as e:
             raise Exception(f"腾讯云OCR失败: {e}")
     
@@ -237,18 +609,18 @@ class OCRManager(QObject):
         
         return f"{algorithm} Credential={secret_id}/{credential_scope}, SignedHeaders={signed_headers}, Signature={signature}"
     
-    def _xinyew_ocr(self, image: Image.Image) -> str:
+    def _xinyew_ocr(self, image: Image.Image, cancel_token: Optional[CancellationToken] = None) -> str:
         """新野图床+云智OCR识别（免费公益接口）"""
         try:
             # 1. 上传图片到新野图床
             upload_url = "https://api.xinyew.cn/api/360tc"
             
-            buffer = io.BytesIO()
-            image.save(buffer, format='PNG')
-            buffer.seek(0)
+            encoded = self.image_compressor.prepare(image, allowed_formats=("PNG", "JPEG"))
+            buffer = io.BytesIO(encoded.get_bytes())
             
-            files = {'file': ('image.png', buffer, 'image/png')}
-            upload_response = requests.post(upload_url, files=files, timeout=10)
+            files = {'file': (f'image.{encoded.get_extension()}', buffer, encoded.get_mime_type())}
+            http_client = self._get_http_client()
+            upload_response = http_client.post(upload_url, files=files, timeout=10, cancel_token=cancel_token)
             upload_response.raise_for_status()
             
             upload_result = upload_response.json()
@@ -261,10 +633,11 @@ class OCRManager(QObject):
             
             # 2. 调用云智OCR接口
             ocr_url = "https://api.jkyai.top/API/ocrwzsb.php"
-            ocr_response = requests.get(
+            ocr_response = http_client.get(
                 ocr_url,
                 params={"url": image_url, "type": "json"},
-                timeout=10
+                timeout=10,
+                cancel_token=cancel_token
             )
             ocr_response.raise_for_status()
             
@@ -273,18 +646,20 @@ class OCRManager(QObject):
             # 3. 解析结果
             words_result = ocr_result.get("words_result", [])
             if not words_result:
-                ocr_text = "未识别到文字内容"
+                ocr_text = self.NO_TEXT_RESULT
             else:
                 # 合并所有识别的文字
                 text_lines = [item.get("words", "") for item in words_result]
                 ocr_text = "\n".join(text_lines)
             
             return ocr_text
-            
+        
+        except TaskCancelledError:
+            raise
         except Exception as e:
             raise Exception(f"新野OCR识别失败: {e}")
     
-    def _vision_model_ocr(self, image: Image.Image) -> str:
+    def _vision_model_ocr(self, image: Image.Image, cancel_token: Optional[CancellationToken] = None) -> str:
         """视觉模型OCR"""
         try:
             # 获取OCR专用视觉模型配置
@@ -297,10 +672,10 @@ class OCRManager(QObject):
             if not vision_model.get('model_id') or not vision_model.get('api_endpoint') or not vision_model.get('api_key'):
                 raise ValueError("OCR视觉模型配置不完整")
             
-            # 将图片转换为base64
-            buffer = io.BytesIO()
-            image.save(buffer, format='PNG')
-            image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            # 按OCR模型的像素预算压缩，并转换为data URL
+            image_url = self.image_compressor.prepare(
+                image, max_pixels=vision_model.get('max_image_pixels')
+            ).get_data_url()
             
             # 获取OCR提示词
             ocr_prompt = vision_model.get('prompt', '请识别图片中的文字内容，并格式化后给我。只返回识别到的文字，不要添加任何解释或说明。')
@@ -314,7 +689,7 @@ class OCRManager(QObject):
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/png;base64,{image_base64}"
+                                "url": image_url
                             }
                         }
                     ]
@@ -333,11 +708,12 @@ class OCRManager(QObject):
                 "Authorization": f"Bearer {vision_model.get('api_key', '')}"
             }
             
-            response = requests.post(
+            response = self._get_http_client().post(
                 vision_model.get('api_endpoint', ''),
                 headers=headers,
                 json=request_data,
-                timeout=120
+                timeout=120,
+                cancel_token=cancel_token
             )
             
             if response.status_code != 200:
@@ -350,52 +726,100 @@ class OCRManager(QObject):
             
             ocr_text = result['choices'][0]['message']['content'].strip()
             return ocr_text
-            
+        
+        except TaskCancelledError:
+            raise
         except Exception as e:
             raise Exception(f"视觉模型OCR失败: {e}")
 
 
-class AIRequestThread(QThread):
-    """AI请求线程"""
-    
-    response_completed = pyqtSignal(str)  # 响应完成信号
-    request_failed = pyqtSignal(str)      # 请求失败信号
-    streaming_response = pyqtSignal(str, str)  # 流式响应信号 (类型, 内容)
-    reasoning_content = pyqtSignal(str)   # 推理内容信号
+class AIRequest:
+    """AI请求，在共享的任务执行器中运行
+
+    run() 返回完整回复；流式内容和推理内容经执行器派发到界面线程的回调，停止后不再派发。
+    """
     
-    def __init__(self, ai_config, prompt, image=None, ocr_text=None):
-        super().__init__()
+    def __init__(self, ai_config, prompt, image=None, ocr_text=None, image_compressor=None,
+                 on_streaming=None, on_reasoning=None):
         self.ai_config = ai_config
         self.prompt = prompt
         self.image = image
         self.ocr_text = ocr_text
+        self.image_compressor = image_compressor
         self.should_stop = False
+        self.cancel_token = CancellationToken()
+        self.reasoning_text = ""
+        self.on_streaming = on_streaming  # 回调 (类型, 内容)
+        self.on_reasoning = on_reasoning  # 回调 (内容)
+        self.future = None  # 提交到任务执行器后的Future，用于取消排队中的请求
+        self.http_client = HttpClientManager.instance()
+        self.executor = TaskExecutor.instance()
     
     def stop_request(self):
-        """停止请求"""
+        """停止请求，关闭进行中的连接，不等待请求结束"""
         self.should_stop = True
+        self.cancel_token.cancel()
+    
+    def _emit(self, callback, *args):
+        """把中间结果派发到界面线程"""
+        if callback and not self.should_stop:
+            self.executor.dispatch(callback, *args)
     
     def run(self):
-        """执行AI请求"""
-        try:
-            response = self._send_ai_request()
-            if not self.should_stop:
-                self.response_completed.emit(response)
-        except Exception as e:
-            if not self.should_stop:
-                self.request_failed.emit(str(e))
+        """执行AI请求，返回回复内容"""
+        self.cancel_token.raise_if_cancelled()
+        return self._send_ai_request()
+    
+    async def run_async(self, engine):
+        """在asyncio引擎上执行AI请求，返回回复内容"""
+        # 图片压缩编码较耗CPU，放到线程中进行，避免阻塞事件循环
+        headers, request_data = await asyncio.to_thread(self._build_request)
+        url = self.ai_config.get('api_endpoint', '')
+        
+        if not request_data["stream"]:
+            response = await engine.request("POST", url, headers=headers, json=request_data, timeout=60)
+            return self._parse_normal_response(response)
+        
+        async with engine.stream("POST", url, headers=headers, json=request_data, timeout=60) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise Exception(f"API请求失败: {response.status_code} - {response.text}")
+            
+            # 按需逐行读取，界面处理不过来时不会提前把整个响应读进内存
+            full_content = ""
+            async for line in response.aiter_lines():
+                if self.should_stop:
+                    break
+                if line:
+                    done, content = self._handle_stream_line(line)
+                    if done:
+                        break
+                    full_content += content
+            return full_content
     
     def _send_ai_request(self):
         """发送AI请求"""
+        headers, request_data = self._build_request()
+        if request_data["stream"]:
+            return self._handle_streaming_response(headers, request_data)
+        else:
+            return self._handle_normal_response(headers, request_data)
+    
+    def _build_request(self):
+        """构建请求头和请求数据"""
         # 构建请求消息
         messages = []
         
         if self.image and self.ai_config.get('vision_support', False):
             # 支持视觉的模型
-            # 将图片转换为base64
-            img_byte_arr = io.BytesIO()
-            self.image.save(img_byte_arr, format='PNG')
-            img_base64 = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
+            # 将图片转换为data URL（与OCR共享同一份编码结果）
+            if self.image_compressor:
+                encoded = self.image_compressor.prepare(
+                    self.image, max_pixels=self.ai_config.get('max_image_pixels')
+                )
+            else:
+                encoded = EncodedImage.of(self.image)
+            image_url = encoded.get_data_url()
             
             messages.append({
                 "role": "user",
@@ -404,7 +828,7 @@ class AIRequestThread(QThread):
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{img_base64}"
+                            "url": image_url
                         }
                     }
                 ]
@@ -432,26 +856,25 @@ class AIRequestThread(QThread):
             "stream": enable_streaming
         }
         
-        # 发送请求
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.ai_config.get('api_key', '')}"
         }
-        
-        if enable_streaming:
-            return self._handle_streaming_response(headers, request_data)
-        else:
-            return self._handle_normal_response(headers, request_data)
+        return headers, request_data
     
     def _handle_normal_response(self, headers, request_data):
         """处理普通响应"""
-        response = requests.post(
+        response = self.http_client.post(
             self.ai_config.get('api_endpoint', ''),
             headers=headers,
             json=request_data,
-            timeout=60
+            timeout=60,
+            cancel_token=self.cancel_token
         )
-        
+        return self._parse_normal_response(response)
+    
+    def _parse_normal_response(self, response):
+        """解析普通响应，requests和httpx的响应对象均可"""
         if response.status_code != 200:
             raise Exception(f"API请求失败: {response.status_code} - {response.text}")
         
@@ -466,20 +889,29 @@ class AIRequestThread(QThread):
         reasoning_content, response_content = self._parse_reasoning_and_response(content)
         
         if reasoning_content:
-            self.reasoning_content.emit(reasoning_content)
+            self.reasoning_text = reasoning_content
+            self._emit(self.on_reasoning, reasoning_content)
         
         return response_content or content
     
     def _handle_streaming_response(self, headers, request_data):
         """处理流式响应"""
-        response = requests.post(
+        response = self.http_client.post(
             self.ai_config.get('api_endpoint', ''),
             headers=headers,
             json=request_data,
             timeout=60,
-            stream=True
+            stream=True,
+            cancel_token=self.cancel_token
         )
-        
+        try:
+            return self._read_stream(response)
+        finally:
+            self.cancel_token.unregister(response)
+            response.close()
+    
+    def _read_stream(self, response):
+        """逐行读取流式响应"""
         if response.status_code != 200:
             raise Exception(f"API请求失败: {response.status_code} - {response.text}")
         
@@ -490,33 +922,43 @@ class AIRequestThread(QThread):
                 break
                 
             if line:
-                line = line.decode('utf-8')
-                if line.startswith('data: '):
-                    data = line[6:]
-                    if data == '[DONE]':
-                        break
-                    
-                    try:
-                        chunk = json.loads(data)
-                        if 'choices' in chunk and chunk['choices']:
-                            delta = chunk['choices'][0].get('delta', {})
-                            
-                            # 处理推理内容（只依据API返回的reasoning_content字段）
-                            if 'reasoning_content' in delta and delta['reasoning_content']:
-                                reasoning_content = delta['reasoning_content']
-                                self.reasoning_content.emit(reasoning_content)
-                            
-                            # 处理普通响应内容
-                            if 'content' in delta and delta['content']:
-                                content = delta['content']
-                                full_content += content
-                                self.streaming_response.emit("content", content)
-                                
-                    except json.JSONDecodeError:
-                        continue
+                done, content = self._handle_stream_line(line.decode('utf-8'))
+                if done:
+                    break
+                full_content += content
         
         return full_content
     
+    def _handle_stream_line(self, line):
+        """处理一行SSE数据，返回 (是否结束, 新增的回复内容)"""
+        if not line.startswith('data: '):
+            return False, ""
+        data = line[6:]
+        if data == '[DONE]':
+            return True, ""
+        
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            return False, ""
+        
+        content = ""
+        if 'choices' in chunk and chunk['choices']:
+            delta = chunk['choices'][0].get('delta', {})
+            
+            # 处理推理内容（只依据API返回的reasoning_content字段）
+            if 'reasoning_content' in delta and delta['reasoning_content']:
+                reasoning_content = delta['reasoning_content']
+                self.reasoning_text += reasoning_content
+                self._emit(self.on_reasoning, reasoning_content)
+            
+            # 处理普通响应内容
+            if 'content' in delta and delta['content']:
+                content = delta['content']
+                self._emit(self.on_streaming, "content", content)
+        
+        return False, content
+    
     def _parse_reasoning_and_response(self, content):
         """解析推理内容和回复内容"""
         reasoning_content = ""
@@ -536,54 +978,240 @@ class AIRequestThread(QThread):
 
 
 class AIClientManager(QObject):
-    """AI客户端管理器"""
+    """AI客户端管理器
+
+    每个分析任务的请求提交到共享的任务执行器，信号的第一个参数为任务ID，多个任务的请求可以同时进行。
+    """
     
-    response_completed = pyqtSignal(str)  # 响应完成信号
-    request_failed = pyqtSignal(str)      # 请求失败信号
-    streaming_response = pyqtSignal(str, str)  # 流式响应信号
-    reasoning_content = pyqtSignal(str)   # 推理内容信号
+    response_completed = pyqtSignal(object, str)  # 响应完成信号 (任务ID, 内容)
+    request_failed = pyqtSignal(object, str)      # 请求失败信号 (任务ID, 错误信息)
+    streaming_response = pyqtSignal(object, str, str)  # 流式响应信号 (任务ID, 类型, 内容)
+    reasoning_content = pyqtSignal(object, str)   # 推理内容信号 (任务ID, 内容)
     
     def __init__(self, config_manager):
         super().__init__()
         self.config_manager = config_manager
-        self.current_thread = None
+        self.requests = {}  # 任务ID -> 进行中的请求
+        self.executor = TaskExecutor.instance()
+        self.image_compressor = ImageCompressor(config_manager)
+        self.response_cache = AIResponseCache()
+        self._pending_replays = {}  # 任务ID -> 重放标识
     
-    def send_request(self, model_name, prompt, image=None, ocr_text=None):
-        """发送AI请求"""
+    def get_endpoints(self) -> list:
+        """获取AI模型端点，用于连接预热"""
+        return [self.config_manager.get_config("ai_model.api_endpoint")]
+    
+    def prewarm(self):
+        """在后台预先建立到AI端点的连接，使用与请求相同的网络引擎"""
+        if use_async_engine(self.config_manager.get_config("network")):
+            AsyncHttpEngine.instance().prewarm(self.get_endpoints())
+        else:
+            HttpClientManager.instance().prewarm(self.get_endpoints())
+    
+    def _get_cache_key(self, ai_config, prompt, image, ocr_text) -> Optional[str]:
+        """获取回答缓存键，未启用缓存或温度过高时返回None"""
+        cache_config = self.config_manager.get_config("cache") or {}
+        if not cache_config.get("ai_enabled", True):
+            return None
+        
+        # 温度较高时用户期望每次得到不同的回答，不使用缓存
+        if float(ai_config.get('temperature', 0.3)) > float(cache_config.get("ai_max_temperature", 0.5)):
+            return None
+        
+        self.response_cache.max_entries = int(cache_config.get("ai_max_entries", 100))
+        self.response_cache.ttl_seconds = float(cache_config.get("ai_ttl_seconds", 3600))
+        
+        image_digest = None
+        if image is not None and ai_config.get('vision_support', False):
+            image_digest = EncodedImage.of(image).get_pixel_digest()
+        return AIResponseCache.make_key(ai_config, prompt, ocr_text, image_digest)
+    
+    def _replay_cached_response(self, job_id, replay_id, entry, enable_streaming):
+        """以本地速度重放缓存的回答，信号与真实请求一致"""
+        if self._pending_replays.get(job_id) is not replay_id:
+            # 重放前请求已被停止或被新请求取代
+            return
+        del self._pending_replays[job_id]
+        
+        if entry["reasoning"]:
+            self.reasoning_content.emit(job_id, entry["reasoning"])
+        if enable_streaming and entry["content"]:
+            self.streaming_response.emit(job_id, "content", entry["content"])
+        self.response_completed.emit(job_id, entry["content"])
+    
+    def _is_current(self, job_id, request) -> bool:
+        """检查请求是否仍是该任务当前的请求，已停止或被取代的请求不再发出信号"""
+        return self.requests.get(job_id) is request
+    
+    def _on_streaming(self, job_id, request, content_type, content):
+        """转发流式内容"""
+        if self._is_current(job_id, request):
+            self.streaming_response.emit(job_id, content_type, content)
+    
+    def _on_reasoning(self, job_id, request, content):
+        """转发推理内容"""
+        if self._is_current(job_id, request):
+            self.reasoning_content.emit(job_id, content)
+    
+    def _on_request_completed(self, job_id, request, cache_key, response):
+        """请求完成：写入回答缓存并发出完成信号"""
+        if not self._is_current(job_id, request):
+            return
+        del self.requests[job_id]
+        if cache_key and response:
+            self.response_cache.put(cache_key, response, request.reasoning_text)
+        self.response_completed.emit(job_id, response)
+    
+    def _on_request_failed(self, job_id, request, error):
+        """请求失败：发出失败信号"""
+        if not self._is_current(job_id, request):
+            return
+        del self.requests[job_id]
+        self.request_failed.emit(job_id, str(error))
+    
+    def send_request(self, model_name, prompt, image=None, ocr_text=None, job_id=None):
+        """发送AI请求，job_id 用于区分同时进行的多个任务"""
         try:
             # 获取AI配置
             ai_config = self.config_manager.get_config("ai_model")
             if not ai_config:
-                self.request_failed.emit("AI模型配置不存在")
+                self.request_failed.emit(job_id, "AI模型配置不存在")
                 return
             
-            # 停止之前的请求
-            self.stop_request()
+            # 停止该任务之前的请求，其他任务的请求不受影响
+            self._stop_job(job_id)
             
-            # 创建新的请求线程
-            self.current_thread = AIRequestThread(ai_config, prompt, image, ocr_text)
-            self.current_thread.response_completed.connect(self.response_completed)
-            self.current_thread.request_failed.connect(self.request_failed)
-            self.current_thread.streaming_response.connect(self.streaming_response)
-            self.current_thread.reasoning_content.connect(self.reasoning_content)
+            # 命中缓存时不再请求API，在事件循环中重放缓存的回答
+            cache_key = self._get_cache_key(ai_config, prompt, image, ocr_text)
+            cached = self.response_cache.get(cache_key) if cache_key else None
+            if cached:
+                logging.info("AI回答缓存命中，跳过API请求")
+                replay_id = object()
+                self._pending_replays[job_id] = replay_id
+                enable_streaming = ai_config.get('enable_streaming', False)
+                QTimer.singleShot(0, lambda: self._replay_cached_response(job_id, replay_id, cached, enable_streaming))
+                return
             
-            # 启动线程
-            self.current_thread.start()
+            # 提交到任务执行器，结果和中间内容都在界面线程中回调
+            request = AIRequest(
+                ai_config, prompt, image, ocr_text, self.image_compressor,
+                on_streaming=lambda content_type, content: self._on_streaming(job_id, request, content_type, content),
+                on_reasoning=lambda content: self._on_reasoning(job_id, request, content)
+            )
+            self.requests[job_id] = request
+            on_success = lambda response: self._on_request_completed(job_id, request, cache_key, response)
+            on_failure = lambda error: self._on_request_failed(job_id, request, error)
+            if use_async_engine(self.config_manager.get_config("network")):
+                # 在asyncio引擎的事件循环中执行，不占用执行器线程，停止时由取消令牌取消
+                engine = AsyncHttpEngine.instance()
+                future = engine.submit(request.run_async(engine), request.cancel_token)
+                self.executor.when_done(future, on_success, on_failure)
+            else:
+                request.future = self.executor.submit(request.run, on_success=on_success, on_failure=on_failure)
             
         except Exception as e:
-            self.request_failed.emit(str(e))
+            self.request_failed.emit(job_id, str(e))
     
-    def stop_request(self):
-        """停止当前请求"""
-        if self.current_thread and self.current_thread.isRunning():
-            self.current_thread.stop_request()
-            self.current_thread.wait()
+    def _stop_job(self, job_id):
+        """停止单个任务的请求，不等待请求结束，已停止的请求不再发出信号"""
+        self._pending_replays.pop(job_id, None)
+        request = self.requests.pop(job_id, None)
+        if request:
+            request.stop_request()
+            # 还在执行器队列中排队的请求直接取消
+            if request.future:
+                request.future.cancel()
+    
+    def stop_request(self, job_id=None):
+        """停止指定任务的请求，不指定时停止全部请求"""
+        if job_id is not None:
+            self._stop_job(job_id)
+            return
+        for pending_job_id in set(self.requests) | set(self._pending_replays):
+            self._stop_job(pending_job_id)
     
     def cleanup(self):
         """清理资源"""
         self.stop_request()
 
 
+class TaskPipeline(QObject):
+    """截图分析流水线
+
+    把一次分析拆成 OCR → AI → 通知 几个阶段，记录每个阶段的耗时；
+    OCR进行期间预先建立到AI端点的连接，OCR一结束AI请求即可直接发出。
+    """
+    
+    stage_finished = pyqtSignal(str, float)  # 阶段完成信号 (阶段名, 耗时毫秒)
+    pipeline_finished = pyqtSignal(dict)     # 流水线结束信号，携带各阶段耗时
+    
+    STAGE_NAMES = {
+        "ocr": "OCR",
+        "ai_first_token": "AI首字",
+        "ai": "AI",
+        "notify": "通知"
+    }
+    
+    def __init__(self, ai_client_manager):
+        super().__init__()
+        self.ai_client_manager = ai_client_manager
+        self.started_at = None
+        self.timings = {}
+        self._stage_started = {}
+    
+    def start(self):
+        """开始新的一次分析"""
+        self.started_at = time.perf_counter()
+        self.timings = {}
+        self._stage_started = {}
+    
+    def prewarm_ai(self):
+        """在后台预先建立到AI端点的连接"""
+        self.ai_client_manager.prewarm()
+    
+    def begin(self, stage: str):
+        """标记阶段开始"""
+        if self.started_at is not None:
+            self._stage_started[stage] = time.perf_counter()
+    
+    def end(self, stage: str):
+        """标记阶段结束并记录耗时"""
+        started = self._stage_started.pop(stage, None)
+        if started is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.timings[stage] = elapsed_ms
+        self.stage_finished.emit(stage, elapsed_ms)
+    
+    def mark_first(self, stage: str, since: str):
+        """记录某个事件首次发生距离since阶段开始的耗时，如AI首字"""
+        started = self._stage_started.get(since)
+        if started is None or stage in self.timings:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.timings[stage] = elapsed_ms
+        self.stage_finished.emit(stage, elapsed_ms)
+    
+    def finish(self, success: bool = True):
+        """结束本次分析，输出各阶段耗时"""
+        if self.started_at is None:
+            return
+        self.timings["total"] = (time.perf_counter() - self.started_at) * 1000
+        self.started_at = None
+        self._stage_started = {}
+        
+        summary = ", ".join(
+            f"{self.STAGE_NAMES.get(stage, stage)} {elapsed:.0f}ms"
+            for stage, elapsed in self.timings.items() if stage != "total"
+        )
+        stats = TaskExecutor.instance().stats()
+        logging.info(
+            f"分析流水线{'完成' if success else '中止'}: {summary or '无'}，总计 {self.timings['total']:.0f}ms"
+            f"（执行器 运行中 {stats['active']}/{stats['max_workers']}，排队 {stats['queued']}）"
+        )
+        self.pipeline_finished.emit(dict(self.timings))
+
+
 class EmailManager(QObject):
     """邮件管理器"""
     
@@ -593,6 +1221,41 @@ class EmailManager(QObject):
     def __init__(self, config_manager):
         super().__init__()
         self.config_manager = config_manager
+        self._smtp_server = None
+        self._smtp_key = None
+    
+    def _get_smtp_connection(self, smtp_config: dict) -> smtplib.SMTP:
+        """获取SMTP连接，连接仍然可用时直接复用，省去重新握手和登录"""
+        key = (smtp_config["server"], smtp_config.get("port", 587), smtp_config["username"])
+        
+        if self._smtp_server and self._smtp_key == key:
+            try:
+                if self._smtp_server.noop()[0] == 250:
+                    return self._smtp_server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._close_smtp_connection()
+        elif self._smtp_server:
+            self._close_smtp_connection()
+        
+        server = smtplib.SMTP(smtp_config["server"], smtp_config.get("port", 587))
+        server.starttls()
+        server.login(smtp_config["username"], smtp_config["password"])
+        self._smtp_server = server
+        self._smtp_key = key
+        return server
+    
+    def _close_smtp_connection(self):
+        """关闭已缓存的SMTP连接"""
+        if self._smtp_server:
+            try:
+                self._smtp_server.quit()
+            except Exception:
+                pass
+        self._smtp_server = None
+        self._smtp_key = None
     
     def send_email(self, subject: str, content: str):
         """发送邮件"""
@@ -619,12 +1282,15 @@ class EmailManager(QObject):
             # 添加邮件内容
             msg.attach(MIMEText(content, 'plain', 'utf-8'))
             
-            # 发送邮件
-            server = smtplib.SMTP(smtp_config["server"], smtp_config.get("port", 587))
-            server.starttls()
-            server.login(smtp_config["username"], smtp_config["password"])
-            server.send_message(msg)
-            server.quit()
+            # 发送邮件（复用已建立的SMTP连接）
+            server = self._get_smtp_connection(smtp_config)
+            try:
+                server.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, OSError):
+                # 连接在检查后被服务器关闭，重新建立连接后重试一次
+                self._close_smtp_connection()
+                server = self._get_smtp_connection(smtp_config)
+                server.send_message(msg)
             
             self.email_sent.emit()
             logging.info("邮件发送成功")
@@ -632,4 +1298,9 @@ class EmailManager(QObject):
         except Exception as e:
             error_msg = f"邮件发送失败: {e}"
             logging.error(error_msg)
-            self.email_failed.emit(error_msg)
\ No newline at end of file
+            self._close_smtp_connection()
+            self.email_failed.emit(error_msg)
+    
+    def cleanup(self):
+        """清理资源"""
+        self._close_smtp_connection()
\ No newline at end of file
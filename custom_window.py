@@ -726,11 +726,11 @@ class NotificationWindow:
             logging.error(f"显示小通知失败: {e}")
     
     @classmethod
-    def show_large_notification(cls, message: str, parent=None):
-        """显示大通知"""
+    def show_large_notification(cls, message: str, parent=None, replace_existing: bool = True):
+        """显示大通知，replace_existing 为False时保留之前的大通知（多个任务同时进行时）"""
         try:
             # 关闭之前的大通知
-            if cls._large_notification and cls._large_notification.isVisible():
+            if replace_existing and cls._large_notification and cls._large_notification.isVisible():
                 cls._large_notification.close()
             
             # 创建新的大通知，不设置父窗口以确保完全独立
@@ -741,11 +741,11 @@ class NotificationWindow:
             logging.error(f"显示大通知失败: {e}")
     
     @classmethod
-    def show_large_notification_streaming(cls, initial_message: str, parent=None):
-        """显示流式大通知"""
+    def show_large_notification_streaming(cls, initial_message: str, parent=None, replace_existing: bool = True):
+        """显示流式大通知，replace_existing 为False时保留之前的大通知（多个任务同时进行时）"""
         try:
             # 关闭之前的大通知
-            if cls._large_notification and cls._large_notification.isVisible():
+            if replace_existing and cls._large_notification and cls._large_notification.isVisible():
                 cls._large_notification.close()
             
             # 创建新的大通知（用于流式显示），不设置父窗口以确保完全独立
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI截图分析图像处理模块
+包含截图编码缓存、上传前压缩、感知哈希、OCR分块等图像相关功能
+"""
+
+import io
+import math
+import base64
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple, Sequence
+from PIL import Image
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class EncodedImage:
+    """截图编码结果缓存
+
+    同一张截图会被OCR、AI请求以及重试多次使用，这里按格式惰性编码并记住结果，
+    所有使用方共享同一份字节、base64和data URL。
+    """
+
+    MIME_TYPES = {
+        "PNG": "image/png",
+        "JPEG": "image/jpeg",
+        "WEBP": "image/webp"
+    }
+
+    def __init__(self, image: Image.Image, format: str = "PNG", quality: Optional[int] = None):
+        self.image = image
+        self.format = format.upper()
+        self.quality = quality
+        self._bytes: Dict[Tuple[str, Optional[int]], bytes] = {}
+        self._base64: Dict[Tuple[str, Optional[int]], str] = {}
+        self._pixel_digest: Optional[str] = None
+        self._perceptual_hash: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def of(cls, image: Image.Image) -> "EncodedImage":
+        """获取附加在截图上的编码缓存，不存在时创建"""
+        encoded = getattr(image, "_encoded_image", None)
+        if encoded is None:
+            encoded = cls(image)
+            image._encoded_image = encoded
+        return encoded
+
+    def _key(self, format: Optional[str], quality: Optional[int]) -> Tuple[str, Optional[int]]:
+        """规范化缓存键，未指定时使用默认格式和质量"""
+        format = (format or self.format).upper()
+        if format == "JPG":
+            format = "JPEG"
+        if format == "PNG":
+            quality = None
+        elif quality is None:
+            quality = self.quality
+        return format, quality
+
+    def _encode(self, format: str, quality: Optional[int]) -> bytes:
+        """执行实际编码"""
+        image = self.image
+        save_kwargs = {}
+
+        if format == "JPEG":
+            # JPEG不支持透明通道和调色板
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            save_kwargs["quality"] = quality or 90
+            save_kwargs["optimize"] = True
+        elif format == "WEBP":
+            if quality is None:
+                save_kwargs["lossless"] = True
+            else:
+                save_kwargs["quality"] = quality
+            save_kwargs["method"] = 4
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=format, **save_kwargs)
+        return buffer.getvalue()
+
+    def get_bytes(self, format: Optional[str] = None, quality: Optional[int] = None) -> bytes:
+        """获取编码后的图片字节"""
+        key = self._key(format, quality)
+        with self._lock:
+            data = self._bytes.get(key)
+            if data is None:
+                data = self._encode(*key)
+                self._bytes[key] = data
+            return data
+
+    def get_base64(self, format: Optional[str] = None, quality: Optional[int] = None) -> str:
+        """获取base64编码字符串"""
+        key = self._key(format, quality)
+        data = self.get_bytes(*key)
+        with self._lock:
+            encoded = self._base64.get(key)
+            if encoded is None:
+                encoded = base64.b64encode(data).decode('utf-8')
+                self._base64[key] = encoded
+            return encoded
+
+    def get_data_url(self, format: Optional[str] = None, quality: Optional[int] = None) -> str:
+        """获取data URL，可直接用于OpenAI格式的image_url"""
+        key = self._key(format, quality)
+        return f"data:{self.get_mime_type(key[0])};base64,{self.get_base64(*key)}"
+
+    def get_pixel_digest(self) -> str:
+        """获取解码后像素数据的SHA-256哈希，与编码格式无关"""
+        with self._lock:
+            if self._pixel_digest is None:
+                digest = hashlib.sha256()
+                digest.update(f"{self.image.mode}|{self.image.width}x{self.image.height}|".encode('utf-8'))
+                digest.update(self.image.tobytes())
+                self._pixel_digest = digest.hexdigest()
+            return self._pixel_digest
+
+    def get_perceptual_hash(self) -> int:
+        """获取感知哈希（dHash），用于查找近似重复的截图"""
+        with self._lock:
+            if self._perceptual_hash is None:
+                self._perceptual_hash = dhash(self.image)
+            return self._perceptual_hash
+
+    def get_mime_type(self, format: Optional[str] = None) -> str:
+        """获取MIME类型"""
+        return self.MIME_TYPES.get(self._key(format, None)[0], "image/png")
+
+    def get_extension(self, format: Optional[str] = None) -> str:
+        """获取文件扩展名"""
+        return self._key(format, None)[0].lower().replace("jpeg", "jpg")
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """计算差值哈希（dHash）
+
+    缩小为 (hash_size+1)×hash_size 的灰度图后比较相邻像素的明暗，
+    对选区边缘几个像素的差异和轻微缩放不敏感。
+    """
+    small = image.resize((hash_size + 1, hash_size), Image.BILINEAR, reducing_gap=2.0).convert("L")
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """计算两个哈希值的汉明距离"""
+    return bin(a ^ b).count("1")
+
+
+def find_blank_rows(image: Image.Image, tolerance: int = 12) -> Optional["np.ndarray"]:
+    """逐行投影，返回每一行是否为空白行（行内亮度极差不超过容差）
+
+    需要numpy，不可用时返回None。
+    """
+    if not NUMPY_AVAILABLE:
+        return None
+    gray = np.asarray(image.convert("L"), dtype=np.uint8)
+    row_range = gray.max(axis=1).astype(np.int16) - gray.min(axis=1)
+    return row_range <= tolerance
+
+
+def split_into_tiles(image: Image.Image, max_tile_height: int, overlap: int = 64) -> List[Tuple[int, int, bool]]:
+    """把高图切成若干横条，返回 [(上边界, 下边界, 是否与上一块重叠)]
+
+    优先在接近目标高度的空白行处切开，保证不会把一行文字切成两半；
+    找不到空白行时硬切，并与上一块重叠overlap像素，拼接文字时再去重。
+    """
+    height = image.height
+    if height <= max_tile_height:
+        return [(0, height, False)]
+
+    blank_rows = find_blank_rows(image)
+    search_range = max_tile_height // 4
+    tiles = []
+    top = 0
+    overlapped = False
+
+    while height - top > max_tile_height:
+        target = top + max_tile_height
+        cut = None
+        if blank_rows is not None:
+            # 在 [target - search_range, target] 内寻找最靠近目标位置的空白行
+            window = blank_rows[target - search_range:target]
+            candidates = np.flatnonzero(window)
+            if candidates.size:
+                cut = target - search_range + int(candidates[-1])
+
+        if cut is not None and cut > top:
+            tiles.append((top, cut, overlapped))
+            top = cut
+            overlapped = False
+        else:
+            tiles.append((top, target, overlapped))
+            top = max(target - overlap, top + 1)
+            overlapped = True
+
+    tiles.append((top, height, overlapped))
+    return tiles
+
+
+def trim_borders(image: Image.Image, tolerance: int = 12, padding: int = 8) -> Image.Image:
+    """裁掉四周与背景色相同的空白边距，保留padding像素的留白"""
+    gray = np.asarray(image.convert("L"), dtype=np.int16)
+    # 以四条边上出现最多的亮度作为背景色
+    border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+    background = int(np.bincount(border.astype(np.uint8)).argmax())
+    content = np.abs(gray - background) > tolerance
+
+    rows = np.flatnonzero(content.any(axis=1))
+    cols = np.flatnonzero(content.any(axis=0))
+    if rows.size == 0 or cols.size == 0:
+        return image
+
+    box = (
+        max(0, int(cols[0]) - padding),
+        max(0, int(rows[0]) - padding),
+        min(image.width, int(cols[-1]) + 1 + padding),
+        min(image.height, int(rows[-1]) + 1 + padding)
+    )
+    if box == (0, 0, image.width, image.height):
+        return image
+    return image.crop(box)
+
+
+def adaptive_binarize(gray: "np.ndarray", block_size: int = 31, offset: int = 10) -> "np.ndarray":
+    """局部均值自适应二值化，输入为深色文字、浅色背景的灰度数组"""
+    height, width = gray.shape
+    radius = block_size // 2
+    # 积分图求每个像素邻域的均值
+    integral = np.pad(gray.astype(np.int64), ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    top = np.clip(np.arange(height) - radius, 0, height)
+    bottom = np.clip(np.arange(height) + radius + 1, 0, height)
+    left = np.clip(np.arange(width) - radius, 0, width)
+    right = np.clip(np.arange(width) + radius + 1, 0, width)
+    area = np.outer(bottom - top, right - left)
+    window_sum = (integral[np.ix_(bottom, right)] - integral[np.ix_(top, right)]
+                  - integral[np.ix_(bottom, left)] + integral[np.ix_(top, left)])
+    return np.where(gray * area < window_sum - offset * area, 0, 255).astype(np.uint8)
+
+
+def preprocess_for_ocr(image: Image.Image, trim: bool = True, invert_dark: bool = True,
+                       binarize: bool = False, upscale_below: int = 0) -> Image.Image:
+    """OCR前预处理：裁掉空白边距、深色主题反色、可选二值化和小图放大
+
+    同一张图片相同参数的结果会被记住，竞速模式下多个引擎共享。需要numpy，不可用时原样返回。
+    """
+    if not NUMPY_AVAILABLE:
+        return image
+
+    options = (trim, invert_dark, binarize, upscale_below)
+    results = getattr(image, "_ocr_preprocessed", None)
+    if results is None:
+        results = {}
+        image._ocr_preprocessed = results
+    if options in results:
+        return results[options]
+
+    result = image
+    if trim:
+        result = trim_borders(result)
+
+    if invert_dark or binarize:
+        gray = np.asarray(result.convert("L"), dtype=np.uint8)
+        inverted = invert_dark and np.median(gray) < 128
+        if inverted:
+            # 深色背景浅色文字，反色为常规的白底黑字
+            gray = 255 - gray
+        if binarize:
+            gray = adaptive_binarize(gray)
+        # 不需要反色或二值化时保留原图颜色
+        if inverted or binarize:
+            result = Image.fromarray(gray)
+
+    if upscale_below and result.height < upscale_below:
+        scale = min(4, math.ceil(upscale_below / result.height))
+        result = result.resize((result.width * scale, result.height * scale), Image.LANCZOS)
+
+    if result is not image:
+        logging.debug(f"OCR预处理: {image.width}x{image.height} -> {result.width}x{result.height}")
+    results[options] = result
+    return result
+
+
+class ImageCompressor:
+    """上传前的自适应图片压缩
+
+    依次完成：按像素预算缩小分辨率、根据图片内容（文字/照片）选择格式、
+    在字节预算内搜索尽可能高的有损压缩质量。
+    """
+
+    # 截图质量档位对应的像素预算、字节预算和有损压缩质量范围
+    QUALITY_PRESETS = {
+        "high": {"max_pixels": 3840 * 2160, "max_bytes": 4 * 1024 * 1024, "min_quality": 70, "max_quality": 95},
+        "medium": {"max_pixels": 2560 * 1440, "max_bytes": 1536 * 1024, "min_quality": 55, "max_quality": 90},
+        "low": {"max_pixels": 1600 * 900, "max_bytes": 512 * 1024, "min_quality": 40, "max_quality": 85}
+    }
+
+    # 内容判断：采样后颜色数不超过该值，或背景色占比超过该值，视为文字/界面截图
+    TEXT_MAX_COLORS = 4096
+    TEXT_MIN_BACKGROUND_RATIO = 0.2
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+
+    def _get_settings(self, max_pixels: Optional[int]) -> dict:
+        """读取截图质量和格式配置"""
+        quality = str(self.config_manager.get_config("screenshot.quality") or "high").lower()
+        settings = dict(self.QUALITY_PRESETS.get(quality, self.QUALITY_PRESETS["high"]))
+        if max_pixels:
+            settings["max_pixels"] = int(max_pixels)
+        settings["format"] = str(self.config_manager.get_config("screenshot.format") or "auto").upper()
+        return settings
+
+    def prepare(self, image: Image.Image, max_pixels: Optional[int] = None,
+                allowed_formats: Sequence[str] = ("PNG", "JPEG", "WEBP")) -> EncodedImage:
+        """获取适合上传的编码结果，同一截图相同参数只压缩一次"""
+        settings = self._get_settings(max_pixels)
+        allowed_formats = tuple(f.upper() for f in allowed_formats)
+        cache_key = (settings["max_pixels"], settings["max_bytes"], settings["format"], allowed_formats)
+
+        # 截图可能同时被OCR和AI请求线程使用，复用编码缓存的锁保证只压缩一次
+        source = EncodedImage.of(image)
+        with source._lock:
+            variants = getattr(image, "_upload_variants", None)
+            if variants is None:
+                variants = {}
+                image._upload_variants = variants
+            encoded = variants.get(cache_key)
+        if encoded is not None:
+            return encoded
+
+        encoded = self._compress(image, settings, allowed_formats)
+        with source._lock:
+            encoded = variants.setdefault(cache_key, encoded)
+
+        logging.info(
+            f"图片压缩完成: {image.width}x{image.height} -> {encoded.image.width}x{encoded.image.height}, "
+            f"{encoded.format}{'' if encoded.quality is None else f' q={encoded.quality}'}, "
+            f"{len(encoded.get_bytes()) // 1024}KB"
+        )
+        return encoded
+
+    def _compress(self, image: Image.Image, settings: dict, allowed_formats: Tuple[str, ...]) -> EncodedImage:
+        """执行缩放、格式选择和质量搜索"""
+        resized = self._resize(image, settings["max_pixels"])
+        if resized is image:
+            # 未缩放时直接复用原图的编码缓存
+            candidate = EncodedImage.of(image)
+        else:
+            candidate = EncodedImage(resized)
+
+        format = settings["format"]
+        if format == "JPG":
+            format = "JPEG"
+
+        if format in allowed_formats and format != "AUTO":
+            if format == "PNG":
+                return self._with_format(candidate, "PNG", None)
+            return self._search_quality(candidate, format, settings)
+
+        # 自动选择：文字截图优先无损PNG，超出字节预算再改用有损格式；照片直接使用有损格式
+        lossy_format = "WEBP" if "WEBP" in allowed_formats else "JPEG"
+        if self._is_text_like(resized):
+            if "PNG" in allowed_formats and len(candidate.get_bytes("PNG")) <= settings["max_bytes"]:
+                return self._with_format(candidate, "PNG", None)
+            return self._search_quality(candidate, lossy_format, settings)
+
+        photo_format = "JPEG" if "JPEG" in allowed_formats else lossy_format
+        return self._search_quality(candidate, photo_format, settings)
+
+    @staticmethod
+    def _resize(image: Image.Image, max_pixels: int) -> Image.Image:
+        """按像素预算等比缩小"""
+        pixels = image.width * image.height
+        if not max_pixels or pixels <= max_pixels:
+            return image
+        scale = math.sqrt(max_pixels / pixels)
+        size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        return image.resize(size, Image.LANCZOS)
+
+    def _is_text_like(self, image: Image.Image) -> bool:
+        """粗略判断图片是否为文字/界面截图（颜色少、背景色占比高）"""
+        sample = image
+        if image.width * image.height > 256 * 256:
+            scale = math.sqrt(256 * 256 / (image.width * image.height))
+            # 最近邻采样，避免插值产生的过渡色干扰颜色统计
+            sample = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.NEAREST)
+        if sample.mode != "RGB":
+            sample = sample.convert("RGB")
+
+        colors = sample.getcolors(maxcolors=self.TEXT_MAX_COLORS)
+        if colors is not None:
+            return True
+
+        # 颜色较多时（抗锯齿文字），再看背景色占比
+        colors = sample.getcolors(maxcolors=sample.width * sample.height)
+        background = max(count for count, _ in colors)
+        return background / (sample.width * sample.height) >= self.TEXT_MIN_BACKGROUND_RATIO
+
+    @staticmethod
+    def _with_format(candidate: EncodedImage, format: str, quality: Optional[int]) -> EncodedImage:
+        """以指定格式作为默认格式返回编码结果（共享已编码的字节）"""
+        encoded = EncodedImage(candidate.image, format, quality)
+        encoded._bytes = candidate._bytes
+        encoded._base64 = candidate._base64
+        encoded._lock = candidate._lock
+        return encoded
+
+    def _search_quality(self, candidate: EncodedImage, format: str, settings: dict) -> EncodedImage:
+        """二分搜索字节预算内的最高质量"""
+        low, high = settings["min_quality"], settings["max_quality"]
+        best = None
+        # 多数截图在最高质量下就已满足预算，先试一次避免完整的二分搜索
+        if len(candidate.get_bytes(format, high)) <= settings["max_bytes"]:
+            best = high
+            low = high + 1
+        while low <= high:
+            quality = (low + high) // 2
+            if len(candidate.get_bytes(format, quality)) <= settings["max_bytes"]:
+                best = quality
+                low = quality + 1
+            else:
+                high = quality - 1
+
+        if best is None:
+            best = settings["min_quality"]
+            logging.warning(f"图片在最低质量下仍超出字节预算: {len(candidate.get_bytes(format, best)) // 1024}KB")
+
+        # 只保留最终选中的编码结果，释放搜索过程中的中间结果
+        with candidate._lock:
+            for key in [k for k in candidate._bytes if k[0] == format and k[1] != best]:
+                del candidate._bytes[key]
+        return self._with_format(candidate, format, best)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI截图分析本地OCR模块
+在常驻进程池中运行本地CPU OCR模型（RapidOCR），无需网络即可识别
+"""
+
+import time
+import logging
+import threading
+import importlib.util
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+from PIL import Image
+
+from util import CancellationToken
+
+# 只检查是否安装，模型在子进程中加载，避免拖慢主进程启动
+RAPIDOCR_AVAILABLE = importlib.util.find_spec("rapidocr_onnxruntime") is not None
+
+# 子进程内的模型实例，每个进程只加载一次
+_worker_engine = None
+
+
+def _init_worker():
+    """子进程初始化：加载OCR模型"""
+    global _worker_engine
+    from rapidocr_onnxruntime import RapidOCR
+    _worker_engine = RapidOCR()
+
+
+def _recognize_in_worker(mode: str, size: Tuple[int, int], data: bytes) -> Tuple[str, Optional[float]]:
+    """子进程内识别，返回 (文字, 平均置信度)"""
+    import numpy as np
+
+    image = Image.frombytes(mode, size, data).convert("RGB")
+    # RapidOCR按OpenCV习惯使用BGR通道顺序
+    result, _ = _worker_engine(np.asarray(image)[:, :, ::-1])
+    if not result:
+        return "", None
+
+    texts = [item[1] for item in result]
+    scores = [float(item[2]) for item in result]
+    return "\n".join(texts), sum(scores) / len(scores)
+
+
+def _warmup_worker() -> bool:
+    """预热子进程：触发模型加载和首次推理"""
+    _recognize_in_worker("RGB", (64, 32), bytes(64 * 32 * 3))
+    return True
+
+
+class LocalOCRPool:
+    """本地OCR进程池
+
+    进程池常驻后台，每个子进程在初始化时加载一次模型，之后复用。
+    子进程意外退出时自动重建进程池。
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """获取进程池，不存在时创建"""
+        with self._lock:
+            if self._executor is None:
+                if not RAPIDOCR_AVAILABLE:
+                    raise RuntimeError("本地OCR需要安装 rapidocr_onnxruntime")
+                logging.info(f"启动本地OCR进程池，进程数: {self.workers}")
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            return self._executor
+
+    def resize(self, workers: int):
+        """调整进程数，变化时关闭旧进程池，下次使用时重建"""
+        workers = max(1, workers)
+        if workers != self.workers:
+            self.workers = workers
+            self.shutdown()
+
+    def warmup(self):
+        """预热所有子进程，不阻塞调用方"""
+        try:
+            executor = self._get_executor()
+            for _ in range(self.workers):
+                executor.submit(_warmup_worker)
+        except Exception as e:
+            logging.warning(f"本地OCR预热失败: {e}")
+
+    # 等待结果时检查取消令牌的间隔（秒）
+    CANCEL_POLL_INTERVAL = 0.1
+
+    def recognize(self, image: Image.Image, timeout: Optional[float] = None,
+                  cancel_token: Optional[CancellationToken] = None) -> Tuple[str, Optional[float]]:
+        """识别图片，返回 (文字, 平均置信度)
+
+        取消后立即返回；子进程中正在进行的推理无法中断，会在后台完成后被丢弃。
+        """
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGB")
+        args = (image.mode, image.size, image.tobytes())
+
+        try:
+            return self._wait(self._get_executor().submit(_recognize_in_worker, *args), timeout, cancel_token)
+        except BrokenProcessPool:
+            logging.warning("本地OCR进程异常退出，重建进程池后重试")
+            self.shutdown()
+            return self._wait(self._get_executor().submit(_recognize_in_worker, *args), timeout, cancel_token)
+
+    def _wait(self, future: Future, timeout: Optional[float],
+              cancel_token: Optional[CancellationToken]) -> Tuple[str, Optional[float]]:
+        """等待识别结果，期间定期检查取消令牌"""
+        if cancel_token is None:
+            return future.result(timeout=timeout)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if cancel_token.cancelled:
+                future.cancel()
+                cancel_token.raise_if_cancelled()
+            interval = self.CANCEL_POLL_INTERVAL
+            if deadline is not None:
+                interval = min(interval, max(0.0, deadline - time.monotonic()))
+            try:
+                return future.result(timeout=interval)
+            except FutureTimeoutError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -8,13 +8,15 @@ AI截图分析主程序
 
 import sys
 import logging
+import multiprocessing
 import threading
-import time
 from PyQt6.QtWidgets import QApplication
 from main_window import MainWindow
-from util import ConfigManager, LogManager, ErrorHandler
+from util import ConfigManager, LogManager, ErrorHandler, HttpClientManager, TaskExecutor
+from async_client import AsyncHttpEngine, use_async_engine
 from core import ScreenshotManager, OCRManager, AIClientManager
-from ai import app as flask_app
+from ai import ProxyServer
+from ai_asgi import AsgiProxyServer, ASGI_AVAILABLE
 
 
 class Application:
@@ -31,14 +33,57 @@ class Application:
         self.ai_client_manager = None
         self.flask_thread = None
         self.flask_port = 58888
+        self.proxy_server = None
     
     def start_flask_server(self):
-        """在后台线程中启动Flask服务"""
+        """在后台线程中启动内置服务（生产模式多线程服务器）"""
+        server_config = self.config_manager.get_config("server") or {}
+        host = server_config.get("host", "127.0.0.1")
+        keepalive_timeout = int(server_config.get("keepalive_timeout", 120))
+        mode = server_config.get("mode", "wsgi")
+        if mode == "asgi" and not ASGI_AVAILABLE:
+            logging.warning("ASGI模式需要安装 httpx 和 uvicorn，已回退到WSGI模式")
+            mode = "wsgi"
         try:
             logging.info(f"正在启动Flask服务于端口 {self.flask_port}...")
-            flask_app.run(host='127.0.0.1', port=self.flask_port, debug=False, use_reloader=False)
+            # 构造时即绑定端口，之后的请求会在监听队列中等待服务线程接收
+            if mode == "asgi":
+                self.proxy_server = AsgiProxyServer(
+                    host=host, port=self.flask_port, keepalive_timeout=keepalive_timeout
+                )
+            else:
+                self.proxy_server = ProxyServer(
+                    host=host,
+                    port=self.flask_port,
+                    threads=int(server_config.get("threads", 16)),
+                    keepalive_timeout=keepalive_timeout
+                )
         except Exception as e:
             logging.error(f"Flask服务启动失败: {e}")
+            return
+        logging.info(f"内置服务使用 {self.proxy_server.backend} 服务器")
+        self.flask_thread = threading.Thread(target=self.proxy_server.serve_forever, daemon=True)
+        self.flask_thread.start()
+    
+    def setup_network(self):
+        """按配置初始化HTTP连接池，并预热OCR和AI端点的连接"""
+        network_config = self.config_manager.get_config("network") or {}
+        http_client = HttpClientManager.instance()
+        http_client.configure(network_config)
+        if use_async_engine(network_config):
+            http_client = AsyncHttpEngine.instance()
+            http_client.configure(network_config)
+        
+        if network_config.get("prewarm", True):
+            endpoints = []
+            if self.ai_client_manager:
+                endpoints.extend(self.ai_client_manager.get_endpoints())
+            if self.ocr_manager:
+                endpoints.extend(self.ocr_manager.get_endpoints())
+            http_client.prewarm(endpoints)
+        
+        if self.ocr_manager:
+            self.ocr_manager.prewarm_local_engine()
     
     def initialize(self):
         """初始化应用程序"""
@@ -73,11 +118,7 @@ class Application:
                 
                 logging.info(f"检测到以下服务使用内置AI: {', '.join(services_using_local)}，启动Flask服务...")
                 
-                self.flask_thread = threading.Thread(target=self.start_flask_server, daemon=True)
-                self.flask_thread.start()
-                
-                # 等待Flask服务启动
-                time.sleep(2)
+                self.start_flask_server()
             else:
                 logging.info("分析AI和OCR AI均未指向内置服务，跳过Flask服务启动")
             
@@ -86,6 +127,10 @@ class Application:
             self.ocr_manager = OCRManager(self.config_manager)
             self.ai_client_manager = AIClientManager(self.config_manager)
             
+            # 初始化连接池，之后每次配置变化都重新预热
+            self.setup_network()
+            self.config_manager.config_changed.connect(self.setup_network)
+            
             # 创建Qt应用
             self.app = QApplication(sys.argv)
             self.app.setApplicationName("AI截图分析")
@@ -122,6 +167,17 @@ class Application:
         try:
             if self.screenshot_manager:
                 self.screenshot_manager.cleanup()
+            if self.main_window:
+                self.main_window.email_manager.cleanup()
+            if self.ocr_manager:
+                self.ocr_manager.cleanup()
+            if self.ai_client_manager:
+                self.ai_client_manager.cleanup()
+            TaskExecutor.instance().shutdown()
+            if self.proxy_server:
+                self.proxy_server.shutdown()
+            AsyncHttpEngine.instance().close()
+            HttpClientManager.instance().close_all()
             logging.info("应用程序退出")
         except Exception as e:
             self.error_handler.handle_error(e, "清理资源失败")
@@ -129,6 +185,8 @@ class Application:
 
 def main():
     """主函数"""
+    # 打包后本地OCR子进程需要此调用才能正常启动
+    multiprocessing.freeze_support()
     app = Application()
     try:
         exit_code = app.run()
@@ -12,33 +12,30 @@ from PyQt6.QtWidgets import (
     QLabel, QPushButton, QTextEdit, QLineEdit, QGroupBox, 
     QFileDialog, QComboBox, QFormLayout
 )
-from PyQt6.QtCore import QThread, pyqtSignal
 from PyQt6.QtGui import QIcon, QPixmap
+from PyQt6.QtCore import QTimer
 
 from custom_window import CustomMessageBox, MarkdownViewer, NotificationWindow
-from util import TaskManager
-from core import EmailManager
+from util import TaskManager, TaskExecutor, CancellationToken
+from core import EmailManager, TaskPipeline
+from cache import PerceptualHashIndex
+from imaging import EncodedImage
 
+DIRECT_VISION = "direct_vision"  # 处理类型：截图直接交给视觉AI分析，不做OCR
 
-class WorkerThread(QThread):
-    """工作线程"""
-    
-    status_update = pyqtSignal(str)
-    task_completed = pyqtSignal(str)
-    task_failed = pyqtSignal(str)
-    
-    def __init__(self, task_func, *args, **kwargs):
-        super().__init__()
-        self.task_func = task_func
-        self.args = args
-        self.kwargs = kwargs
+
+class AnalysisJob:
+    """一次截图分析任务的状态"""
     
-    def run(self):
-        try:
-            result = self.task_func(*self.args, **self.kwargs)
-            self.task_completed.emit(result)
-        except Exception as e:
-            self.task_failed.emit(str(e))
+    def __init__(self, job_id, image, pipeline):
+        self.job_id = job_id
+        self.image = image
+        self.pipeline = pipeline
+        self.answer_key = None
+        self.ocr_future = None
+        self.cancel_token = CancellationToken()
+        self.large_window = None
+        self.near_duplicate_prompt = None
 
 
 class MainWindow(QMainWindow):
@@ -56,8 +53,10 @@ class MainWindow(QMainWindow):
         self.email_manager = EmailManager(config_manager)
         self.notification_window = NotificationWindow()
         
-        self.current_image = None
-        self.worker_thread = None
+        self.jobs = {}  # 任务ID -> AnalysisJob
+        self.current_job_id = None  # 主窗口输出区域正在显示的任务
+        self.executor = TaskExecutor.instance()
+        self.phash_index = None
         
         self.init_ui()
         self.connect_signals()
@@ -271,6 +270,11 @@ class MainWindow(QMainWindow):
         
         control_layout.addWidget(prompt_group)
         
+        # 任务选择：可以停止任意一个进行中或排队中的任务
+        self.task_combo = QComboBox()
+        self.task_combo.setToolTip("选择要停止的任务")
+        control_layout.addWidget(self.task_combo)
+        
         # 强制停止按钮
         self.stop_btn = QPushButton("强制停止任务")
         self.stop_btn.setEnabled(False)
@@ -493,10 +497,10 @@ class MainWindow(QMainWindow):
         self.screenshot_manager.screenshot_taken.connect(self.on_screenshot_taken)
         self.screenshot_manager.screenshot_failed.connect(self.on_screenshot_failed)
         self.screenshot_manager.screenshot_cancelled.connect(self.on_screenshot_cancelled)
+        self.screenshot_manager.selection_settled.connect(self.on_selection_settled)
+        self.screenshot_manager.selection_changed.connect(self.ocr_manager.cancel_speculative_recognition)
         
-        # OCR管理器信号
-        self.ocr_manager.ocr_completed.connect(self.on_ocr_completed)
-        self.ocr_manager.ocr_failed.connect(self.on_ocr_failed)
+        # OCR结果通过每个任务自己的工作线程返回，不使用OCR管理器的全局信号
         
         # AI客户端管理器信号
         self.ai_client_manager.response_completed.connect(self.on_ai_response_completed)
@@ -507,13 +511,18 @@ class MainWindow(QMainWindow):
         # 任务管理器信号
         self.task_manager.task_started.connect(self.on_task_started)
         self.task_manager.task_finished.connect(self.on_task_finished)
+        self.task_manager.queue_changed.connect(self.update_task_buttons)
         
         # 配置管理器信号
         self.config_manager.config_changed.connect(self.load_config_to_ui)
+        self.config_manager.config_changed.connect(self.apply_task_limits)
+        self.apply_task_limits()
     
     def setup_hotkey(self):
         """设置快捷键"""
         self.screenshot_manager.setup_hotkey()
+        # 预创建截图覆盖层，按下快捷键时无需再创建窗口
+        self.screenshot_manager.prewarm_overlay()
     
     def load_config_to_ui(self):
         """加载配置到界面"""
@@ -693,72 +702,224 @@ class MainWindow(QMainWindow):
     
     def start_screenshot(self):
         """开始截图"""
-        if self.task_manager.start_task("截图"):
-            self.screenshot_manager.start_screenshot()
+        if not self.task_manager.can_accept():
+            self.update_status("任务队列已满，请等待当前任务完成")
+            return
+        self.screenshot_manager.start_screenshot()
     
     def import_from_clipboard(self):
         """从剪贴板导入图片"""
-        if self.task_manager.start_task("剪贴板导入"):
-            try:
-                image = self.screenshot_manager.screenshot_from_clipboard()
-                if image:
-                    self.on_screenshot_taken(image)
-                else:
-                    self.update_status("剪贴板中没有图片")
-                    self.task_manager.finish_task()
-            except Exception as e:
-                self.on_screenshot_failed(str(e))
+        try:
+            image = self.screenshot_manager.screenshot_from_clipboard()
+            if image:
+                self.on_screenshot_taken(image)
+            else:
+                self.update_status("剪贴板中没有图片")
+        except Exception as e:
+            self.on_screenshot_failed(str(e))
     
     def stop_task(self):
-        """停止任务"""
-        if self.worker_thread and self.worker_thread.isRunning():
-            self.worker_thread.terminate()
-            self.worker_thread.wait()
+        """停止任务选择框中选中的任务，其他任务继续进行"""
+        task_id = self.task_combo.currentData()
+        if task_id is None:
+            return
+        job = self.jobs.get(task_id)
+        if job is not None:
+            self.cancel_job(job)
+            self.update_status(f"任务{task_id}已停止")
+        elif self.task_manager.cancel_task(task_id):
+            # 排队中的任务直接移出队列
+            self.update_status(f"任务{task_id}已取消")
+    
+    def cancel_job(self, job):
+        """取消单个任务，不等待OCR结束，排队中的OCR直接取消"""
+        job.cancel_token.cancel()
+        if job.ocr_future:
+            job.ocr_future.cancel()
+        self.ai_client_manager.stop_request(job.job_id)
+        self._finish_job(job, success=False)
+    
+    def _finish_job(self, job, success=True):
+        """结束任务，释放任务队列中的位置"""
+        if self.jobs.pop(job.job_id, None) is None:
+            return
+        if job.near_duplicate_prompt:
+            job.near_duplicate_prompt.close()
+        job.pipeline.finish(success=success)
+        self.task_manager.finish_task(job.job_id)
+    
+    def _get_phash_index(self):
+        """获取近似截图索引，未启用时返回None"""
+        cache_config = self.config_manager.get_config("cache") or {}
+        if cache_config.get("near_duplicate", "off") not in ("ask", "auto"):
+            return None
+        
+        index_file = os.path.join(cache_config.get("dir", "cache"), "phash_index.json")
+        if self.phash_index is None or self.phash_index.index_file != index_file:
+            self.phash_index = PerceptualHashIndex(index_file)
+        self.phash_index.threshold = int(cache_config.get("phash_threshold", 3))
+        self.phash_index.max_entries = int(cache_config.get("phash_max_entries", 200))
+        return self.phash_index
+    
+    def _find_near_duplicate(self, job):
+        """查找近似截图的历史结果"""
+        phash_index = self._get_phash_index()
+        if not phash_index:
+            return None
+        
+        try:
+            entry = phash_index.find(EncodedImage.of(job.image).get_perceptual_hash(), job.image.size)
+        except Exception as e:
+            logging.warning(f"查找近似截图失败: {e}")
+            return None
+        
+        if not entry or not (entry.get("ocr_text") or entry["answers"].get(job.answer_key)):
+            return None
+        return entry
+    
+    def _offer_near_duplicate(self, job, entry):
+        """非模态提示是否改用相似截图的历史结果，任务照常进行，选择使用时中止进行中的识别"""
+        if job.job_id not in self.jobs:
+            return
+        # 只有历史OCR文字时，OCR已经完成就没有可节省的了
+        if not entry["answers"].get(job.answer_key) and not (job.ocr_future and not job.ocr_future.done()):
+            return
         
-        if hasattr(self.ai_client_manager, 'stop_request'):
-            self.ai_client_manager.stop_request()
+        prompt = CustomMessageBox(
+            self, "发现相似截图", "这张截图与之前的截图几乎相同，是否直接使用上次的结果？",
+            "question", ["使用上次结果", "继续识别"]
+        )
+        prompt.setModal(False)
+        prompt.finished.connect(lambda _: self._on_near_duplicate_reply(job, entry, prompt.result))
+        job.near_duplicate_prompt = prompt
+        prompt.show()
+    
+    def _on_near_duplicate_reply(self, job, entry, reply):
+        """相似截图提示关闭"""
+        job.near_duplicate_prompt = None
+        if reply != "使用上次结果" or job.job_id not in self.jobs:
+            return
+        
+        cached_answer = entry["answers"].get(job.answer_key)
+        if cached_answer:
+            job.cancel_token.cancel()
+            if job.ocr_future:
+                job.ocr_future.cancel()
+            self.ai_client_manager.stop_request(job.job_id)
+            self.update_job_status(job, "使用相似截图的历史回答")
+            self._complete_job(job, cached_answer)
+        elif job.ocr_future and not job.ocr_future.done():
+            # 先解除任务与进行中OCR的关联，被取消的识别不再回调
+            ocr_future, job.ocr_future = job.ocr_future, None
+            job.cancel_token.cancel()
+            ocr_future.cancel()
+            job.cancel_token = CancellationToken()
+            self.update_job_status(job, "使用相似截图的历史OCR结果")
+            self._on_job_ocr_completed(job, entry["ocr_text"])
+    
+    def _remember_near_duplicate(self, job, ocr_text=None, answer=None):
+        """把任务截图的OCR文字或AI回答记录到近似截图索引"""
+        phash_index = self._get_phash_index()
+        if not phash_index or job.image is None:
+            return
         
-        self.task_manager.finish_task()
-        self.update_status("任务已停止")
+        try:
+            phash = EncodedImage.of(job.image).get_perceptual_hash()
+            if ocr_text:
+                phash_index.add_ocr_text(phash, job.image.size, ocr_text)
+            if answer and job.answer_key:
+                phash_index.add_answer(phash, job.image.size, job.answer_key, answer)
+        except Exception as e:
+            logging.warning(f"记录近似截图失败: {e}")
     
     def on_screenshot_taken(self, image):
-        """截图完成处理"""
-        self.current_image = image
+        """截图完成处理：每张截图作为独立任务提交，没有空位时排队"""
+        task_id = self.task_manager.start_task("截图分析", lambda task_id: self.start_job(task_id, image))
+        if task_id is None:
+            # 截图被丢弃，提前开始的识别也不再需要
+            self.ocr_manager.cancel_speculative_recognition()
+            self.update_status("任务队列已满，本次截图已丢弃")
+        elif self.task_manager.is_pending(task_id):
+            self.update_status(f"任务{task_id}已加入等待队列（等待中 {self.task_manager.pending_count()} 个）")
+    
+    def start_job(self, job_id, image):
+        """开始处理一张截图"""
+        job = AnalysisJob(job_id, image, TaskPipeline(self.ai_client_manager))
+        job.answer_key = PerceptualHashIndex.make_answer_key(
+            self.config_manager.get_config("ai_model.model_id") or "", self.get_selected_prompt_content()
+        )
+        self.jobs[job_id] = job
+        job.pipeline.start()
         
         # 获取OCR配置
         ocr_config = self.config_manager.get_config("ocr")
         ocr_type = ocr_config.get("type", "ocr_then_text") if ocr_config else "ocr_then_text"
         
-        if ocr_type == "direct_image":
+        # 近似截图直接复用之前的结果；询问模式下任务照常进行，提示在任务队列回调之外显示
+        near_duplicate = self._find_near_duplicate(job)
+        if near_duplicate and self.config_manager.get_config("cache.near_duplicate") == "ask":
+            QTimer.singleShot(0, lambda: self._offer_near_duplicate(job, near_duplicate))
+        elif near_duplicate:
+            cached_answer = near_duplicate["answers"].get(job.answer_key)
+            if cached_answer:
+                # 选区稳定时提前开始的识别不再需要
+                self.ocr_manager.cancel_speculative_recognition()
+                self.update_job_status(job, "使用相似截图的历史回答")
+                self._complete_job(job, cached_answer)
+                return
+            if ocr_type != DIRECT_VISION and near_duplicate.get("ocr_text"):
+                self.ocr_manager.cancel_speculative_recognition()
+                self.update_job_status(job, "使用相似截图的历史OCR结果")
+                self._on_job_ocr_completed(job, near_duplicate["ocr_text"])
+                return
+        
+        if ocr_type == DIRECT_VISION:
             # 直接提交图片给AI
-            self.update_status("截图完成，正在请求AI分析...")
-            self._send_ai_request_with_image()
+            self.update_job_status(job, "截图完成，正在请求AI分析...")
+            self._send_ai_request_with_image(job)
         else:
-            # OCR后提交文字
-            self.update_status("截图完成，开始OCR识别...")
-            # 启动OCR工作线程
-            self.worker_thread = WorkerThread(self.ocr_manager.recognize_image, image)
-            self.worker_thread.task_completed.connect(self.on_ocr_completed)
-            self.worker_thread.task_failed.connect(self.on_ocr_failed)
-            self.worker_thread.start()
+            # OCR后提交文字，识别期间预先建立AI连接
+            job.pipeline.prewarm_ai()
+            job.pipeline.begin("ocr")
+            speculative = self.ocr_manager.take_speculative_recognition(image)
+            if speculative:
+                # 选区稳定时已经开始识别，等待其结果即可，取消任务时一并取消提前开始的识别
+                self.update_job_status(job, "截图完成，等待OCR识别结果...")
+                job.ocr_future, job.cancel_token = speculative
+            else:
+                self.update_job_status(job, "截图完成，开始OCR识别...")
+                job.ocr_future = self.executor.submit(self.ocr_manager.recognize_image, image, job.cancel_token)
+            # 识别结果在界面线程中回调
+            ocr_future = job.ocr_future
+            self.executor.when_done(
+                ocr_future,
+                on_success=lambda ocr_text: self._on_job_ocr_completed(job, ocr_text, ocr_future),
+                on_failure=lambda error: self._on_job_ocr_failed(job, str(error), ocr_future)
+            )
     
     def on_screenshot_failed(self, error_msg):
         """截图失败处理"""
         self.update_status(f"截图失败: {error_msg}")
-        self.task_manager.finish_task()
+    
+    def on_selection_settled(self, image):
+        """选区稳定，OCR模式下提前开始识别"""
+        ocr_config = self.config_manager.get_config("ocr") or {}
+        if ocr_config.get("type", "ocr_then_text") != DIRECT_VISION:
+            self.ocr_manager.start_speculative_recognition(image)
+            self.ai_client_manager.prewarm()
     
     def on_screenshot_cancelled(self):
         """截图取消处理"""
+        self.ocr_manager.cancel_speculative_recognition()
         self.update_status("截图已取消")
-        self.task_manager.finish_task()
     
-    def _send_ai_request_with_image(self):
+    def _send_ai_request_with_image(self, job):
         """直接发送图片给AI分析"""
         # 获取配置
         ai_config = self.config_manager.get_config("ai_model")
         
         if not ai_config:
-            self.on_ai_request_failed("配置不完整，请检查AI模型配置")
+            self._fail_job(job, "配置不完整，请检查AI模型配置")
             return
         
         # 获取选中的提示词内容
@@ -766,21 +927,25 @@ class MainWindow(QMainWindow):
         
         if ai_config.get("vision_support", False):
             # 支持视觉的模型直接发送图片
-            self.ai_client_manager.send_request("default", prompt_content, self.current_image)
+            job.pipeline.begin("ai")
+            self.ai_client_manager.send_request("default", prompt_content, job.image, job_id=job.job_id)
         else:
-            self.on_ai_request_failed("当前AI模型不支持图像输入，请选择支持视觉的模型或使用OCR模式")
+            self._fail_job(job, "当前AI模型不支持图像输入，请选择支持视觉的模型或使用OCR模式")
     
-
-    
-    def on_ocr_completed(self, ocr_text):
+    def _on_job_ocr_completed(self, job, ocr_text, ocr_future=None):
         """OCR完成处理"""
-        self.update_status("OCR完成，正在请求AI分析...")
+        if job.job_id not in self.jobs or (ocr_future and ocr_future is not job.ocr_future):
+            # 任务已被取消，或已改用相似截图的历史OCR结果
+            return
+        job.pipeline.end("ocr")
+        self.update_job_status(job, "OCR完成，正在请求AI分析...")
+        self._remember_near_duplicate(job, ocr_text=ocr_text)
         
         # 获取配置
         ai_config = self.config_manager.get_config("ai_model")
         
         if not ai_config:
-            self.on_ai_request_failed("配置不完整，请检查AI模型配置")
+            self._fail_job(job, "配置不完整，请检查AI模型配置")
             return
         
         # 获取选中的提示词内容
@@ -788,95 +953,146 @@ class MainWindow(QMainWindow):
         
         # 发送AI请求（OCR后提交文字模式）
         full_prompt = f"{prompt_content}\n\n以下是OCR识别的文字内容：\n{ocr_text}"
-        self.ai_client_manager.send_request("default", full_prompt)
+        job.pipeline.begin("ai")
+        self.ai_client_manager.send_request("default", full_prompt, job_id=job.job_id)
     
-    def on_ocr_failed(self, error_msg):
+    def _on_job_ocr_failed(self, job, error_msg, ocr_future=None):
         """OCR失败处理"""
-        self.update_status(f"OCR失败: {error_msg}")
-        self.task_manager.finish_task()
+        if job.job_id not in self.jobs or (ocr_future and ocr_future is not job.ocr_future):
+            return
+        self.update_job_status(job, f"OCR失败: {error_msg}")
+        self._finish_job(job, success=False)
     
-    def on_ai_response_completed(self, response):
+    def on_ai_response_completed(self, job_id, response):
         """AI响应完成处理"""
-        self.output_text.set_markdown(response)
-        self.update_status("AI分析完成")
+        job = self.jobs.get(job_id)
+        if job is not None:
+            self._complete_job(job, response)
+    
+    def _complete_job(self, job, response):
+        """任务得到AI回答后显示结果并结束任务"""
+        job.pipeline.end("ai")
+        if job.job_id == self.current_job_id:
+            self.output_text.set_markdown(response)
+        self._remember_near_duplicate(job, answer=response)
+        self.update_job_status(job, "AI分析完成")
         
         # 显示通知
-        self.show_notification("AI分析完成", response)
-        
-        # 如果有大窗口正在显示，完成最终渲染
-        if hasattr(self, 'large_window') and self.large_window:
-            # 流式请求完成后进行一次完整的markdown渲染
-            if hasattr(self.large_window, 'current_response_content'):
-                self.large_window._batch_update_display(force_markdown=True)
+        job.pipeline.begin("notify")
+        self.show_notification("AI分析完成", response, job)
+        job.pipeline.end("notify")
         
-        self.task_manager.finish_task()
+        self._finish_job(job)
     
-    def on_ai_reasoning_content(self, reasoning_content):
+    def on_ai_reasoning_content(self, job_id, reasoning_content):
         """AI推理内容处理"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        
         # 检查通知配置，只有在large_popup时才创建大窗口
         notification_type = self.config_manager.get_config("notification.type") or "small_popup"
         
         if notification_type == "large_popup":
             # 如果没有大窗口，创建一个
-            if not hasattr(self, 'large_window') or not self.large_window:
-                self.large_window = self.show_large_window("AI正在分析...")
+            if not job.large_window:
+                job.large_window = self.show_large_window(job, "AI正在分析...")
             
             # 添加推理内容到大窗口
-            if self.large_window and hasattr(self.large_window, 'append_reasoning_content'):
-                self.large_window.append_reasoning_content(reasoning_content)
+            if job.large_window and hasattr(job.large_window, 'append_reasoning_content'):
+                job.large_window.append_reasoning_content(reasoning_content)
     
-    def on_ai_streaming_response(self, content_type, content):
+    def on_ai_streaming_response(self, job_id, content_type, content):
         """AI流式响应处理"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        
         if content_type == "content":
-            # 更新主窗口输出
-            self.output_text.append_text(content)
+            job.pipeline.mark_first("ai_first_token", "ai")
+            # 更新主窗口输出（只显示最近开始的任务）
+            if job.job_id == self.current_job_id:
+                self.output_text.append_text(content)
             
             # 检查通知配置，只有在large_popup时才创建大窗口
             notification_type = self.config_manager.get_config("notification.type") or "small_popup"
             
             if notification_type == "large_popup":
                 # 如果没有大窗口，创建一个
-                if not hasattr(self, 'large_window') or not self.large_window:
-                    self.large_window = self.show_large_window("AI正在分析...")
+                if not job.large_window:
+                    job.large_window = self.show_large_window(job, "AI正在分析...")
                 
                 # 添加响应内容到大窗口
-                if self.large_window and hasattr(self.large_window, 'append_response_content'):
-                    self.large_window.append_response_content(content)
+                if job.large_window and hasattr(job.large_window, 'append_response_content'):
+                    job.large_window.append_response_content(content)
     
-    def on_ai_request_failed(self, error_msg):
+    def on_ai_request_failed(self, job_id, error_msg):
         """AI请求失败处理"""
-        self.output_text.set_markdown(f"**错误**: {error_msg}")
-        self.update_status(f"AI请求失败: {error_msg}")
-        self.task_manager.finish_task()
+        job = self.jobs.get(job_id)
+        if job is not None:
+            self._fail_job(job, error_msg)
     
-
+    def _fail_job(self, job, error_msg):
+        """任务的AI请求失败"""
+        if job.job_id == self.current_job_id:
+            self.output_text.set_markdown(f"**错误**: {error_msg}")
+        self.update_job_status(job, f"AI请求失败: {error_msg}")
+        self._finish_job(job, success=False)
     
-    def on_task_started(self):
-        """任务开始处理"""
-        self.screenshot_btn.setEnabled(False)
-        self.clipboard_btn.setEnabled(False)
-        self.stop_btn.setEnabled(True)
+    def on_task_started(self, job_id):
+        """任务开始处理：主窗口切换为显示最新的任务"""
+        self.current_job_id = job_id
+        self.update_task_buttons()
+        self.task_combo.setCurrentIndex(self.task_combo.findData(job_id))
         
         # 清空输出区域，准备显示新的AI分析结果
         self.output_text.set_markdown("")
-        
-        # 关闭之前的大窗口（如果存在）
-        if hasattr(self, 'large_window') and self.large_window:
-            self.large_window.close()
-            self.large_window = None
     
-    def on_task_finished(self):
+    def on_task_finished(self, job_id):
         """任务完成处理"""
-        self.screenshot_btn.setEnabled(True)
-        self.clipboard_btn.setEnabled(True)
-        self.stop_btn.setEnabled(False)
+        self.update_task_buttons()
+    
+    def update_task_buttons(self):
+        """按任务队列状态更新按钮"""
+        can_accept = self.task_manager.can_accept()
+        self.screenshot_btn.setEnabled(can_accept)
+        self.clipboard_btn.setEnabled(can_accept)
+        self.update_task_combo()
+        self.stop_btn.setEnabled(self.task_combo.count() > 0)
+    
+    def update_task_combo(self):
+        """按任务队列刷新任务选择框，保留之前的选择，否则选中主窗口正在显示的任务"""
+        selected = self.task_combo.currentData()
+        self.task_combo.clear()
+        for task_id in self.task_manager.running_tasks():
+            self.task_combo.addItem(f"任务{task_id}（进行中）", task_id)
+        for task_id in self.task_manager.pending_tasks():
+            self.task_combo.addItem(f"任务{task_id}（等待中）", task_id)
+        
+        index = self.task_combo.findData(selected)
+        if index < 0:
+            index = self.task_combo.findData(self.current_job_id)
+        self.task_combo.setCurrentIndex(max(0, index) if self.task_combo.count() else -1)
+    
+    def apply_task_limits(self):
+        """按配置设置任务并发数和队列长度"""
+        task_config = self.config_manager.get_config("task") or {}
+        self.task_manager.configure(task_config.get("max_concurrent", 3), task_config.get("max_queued", 5))
+        self.executor.configure(task_config.get("max_workers", 6))
+        self.update_task_buttons()
     
     def update_status(self, message):
         """更新状态"""
         self.status_label.setText(message)
         logging.info(message)
     
-    def show_notification(self, title: str, content: str):
+    def update_job_status(self, job, message):
+        """更新任务状态，允许多个任务同时进行时带上任务编号"""
+        if self.task_manager.max_concurrent > 1:
+            message = f"[任务{job.job_id}] {message}"
+        self.update_status(message)
+    
+    def show_notification(self, title: str, content: str, job=None):
         """显示通知 - 小窗口只显示AI回复内容"""
         notification_type = self.config_manager.get_config("notification.type") or "small_popup"
         
@@ -887,8 +1103,15 @@ class MainWindow(QMainWindow):
             # 显示小型弹窗通知 - 只显示AI回复内容，不显示推理内容
             self.notification_window.show_small_notification(content)
         elif notification_type == "large_popup":
-            # 显示大型弹窗通知
-            self.notification_window.show_large_notification(content)
+            if job and job.large_window and job.large_window.isVisible():
+                # 流式请求完成后在任务自己的大窗口中进行一次完整的markdown渲染
+                if hasattr(job.large_window, 'current_response_content'):
+                    job.large_window._batch_update_display(force_markdown=True)
+            else:
+                # 显示大型弹窗通知，其他任务仍在进行时保留它们的窗口
+                self.notification_window.show_large_notification(
+                    content, replace_existing=not self._has_other_live_windows(job)
+                )
         elif notification_type == "email":
             # 发送邮件通知
             self.send_email_notification(title, content)
@@ -896,19 +1119,24 @@ class MainWindow(QMainWindow):
             # 默认使用小型弹窗
             self.notification_window.show_small_notification(content)
     
-    def show_large_window(self, initial_message: str):
-        """显示大窗口（统一用于推理内容和流式响应）"""
+    def _has_other_live_windows(self, job) -> bool:
+        """检查其他进行中的任务是否有打开的大窗口"""
+        return any(other.large_window for other in self.jobs.values() if other is not job)
+    
+    def show_large_window(self, job, initial_message: str):
+        """为任务显示大窗口（统一用于推理内容和流式响应）"""
         try:
             from custom_window import NotificationWindow
-            # 关闭之前的大窗口
-            if hasattr(self, 'large_window') and self.large_window:
-                self.large_window.close()
-            
-            # 创建新的大窗口
-            self.large_window = NotificationWindow.show_large_notification_streaming(initial_message, self)
-            if self.large_window:
-                self.large_window.setWindowTitle("AI分析结果")
-            return self.large_window
+            # 创建新的大窗口，其他任务仍在进行时保留它们的窗口
+            large_window = NotificationWindow.show_large_notification_streaming(
+                initial_message, self, replace_existing=not self._has_other_live_windows(job)
+            )
+            if large_window:
+                title = "AI分析结果"
+                if self.task_manager.max_concurrent > 1:
+                    title = f"AI分析结果 - 任务{job.job_id}"
+                large_window.setWindowTitle(title)
+            return large_window
         except Exception as e:
             logging.error(f"显示大窗口失败: {e}")
             return None
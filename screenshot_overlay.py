@@ -5,12 +5,13 @@ AI截图分析 - 高级截图覆盖层
 提供流畅的截图体验，包括区域选择、确认/取消等功能
 """
 
+import time
 import logging
 from PIL import ImageGrab, Image
-from PyQt6.QtCore import Qt, QRect, QPoint, pyqtSignal
+from PyQt6.QtCore import Qt, QRect, QPoint, QTimer, pyqtSignal
 from PyQt6.QtGui import (
     QPainter, QPen, QColor, QFont, 
-    QFontMetrics, QKeySequence, QShortcut
+    QFontMetrics, QKeySequence, QShortcut, QImage, QPixmap, QRegion, QCursor
 )
 from PyQt6.QtWidgets import (
     QWidget, QApplication, QHBoxLayout, 
@@ -18,12 +19,56 @@ from PyQt6.QtWidgets import (
 )
 
 
+def qimage_to_pil(qimage: QImage) -> Image.Image:
+    """把QImage转换为PIL图片，直接读取像素缓冲区，不经过PNG等编码"""
+    if qimage.format() not in (QImage.Format.Format_RGB32, QImage.Format.Format_ARGB32,
+                               QImage.Format.Format_ARGB32_Premultiplied):
+        qimage = qimage.convertToFormat(QImage.Format.Format_RGB32)
+    
+    buffer = qimage.constBits()
+    buffer.setsize(qimage.sizeInBytes())
+    # Qt的32位格式按像素存储为0xAARRGGBB，小端机器上内存顺序为BGRA
+    return Image.frombuffer(
+        "RGB", (qimage.width(), qimage.height()), buffer, "raw", "BGRX", qimage.bytesPerLine(), 1
+    )
+
+
+class ScreenGrab:
+    """单个屏幕的背景截图
+
+    rect 为屏幕在覆盖层中的逻辑坐标，pixmap 为该屏幕按自身DPI缩放的物理像素截图。
+    """
+    
+    def __init__(self, rect: QRect, pixmap: QPixmap):
+        self.rect = rect
+        self.pixmap = pixmap
+        self.device_pixel_ratio = pixmap.devicePixelRatio()
+        
+        # 预先合成带半透明遮罩的背景，拖动选择时无需每帧重新叠加遮罩
+        self.dimmed_pixmap = pixmap.copy()
+        painter = QPainter(self.dimmed_pixmap)
+        painter.fillRect(self.dimmed_pixmap.rect(), QColor(0, 0, 0, 120))  # 半透明黑色
+        painter.end()
+        
+    def to_device_rect(self, rect: QRect) -> QRect:
+        """把覆盖层逻辑坐标的矩形换算为该屏幕截图内的物理像素坐标"""
+        local_rect = rect.translated(-self.rect.topLeft())
+        return QRect(
+            round(local_rect.x() * self.device_pixel_ratio),
+            round(local_rect.y() * self.device_pixel_ratio),
+            round(local_rect.width() * self.device_pixel_ratio),
+            round(local_rect.height() * self.device_pixel_ratio)
+        )
+
+
 class ScreenshotOverlay(QWidget):
     """截图覆盖层窗口"""
     
     # 信号定义
     screenshot_confirmed = pyqtSignal(object)  # 确认截图信号
     screenshot_cancelled = pyqtSignal()  # 取消截图信号
+    selection_settled = pyqtSignal(object)  # 选区保持不变一段时间后发出，携带裁剪好的截图
+    selection_changed = pyqtSignal()  # 已发出selection_settled的选区又被修改
     
     def __init__(self):
         super().__init__()
@@ -40,30 +85,106 @@ class ScreenshotOverlay(QWidget):
             Qt.WindowType.Tool
         )
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.setWindowState(Qt.WindowState.WindowFullScreen)
         
         # 设置鼠标追踪
         self.setMouseTracking(True)
         
-        # 获取屏幕尺寸
-        screen = QApplication.primaryScreen()
-        self.screen_geometry = screen.geometry()
-        self.setGeometry(self.screen_geometry)
+        # 背景截图在每次激活时刷新
+        self.screen_geometry = QRect()
+        self.screen_grabs = []
+        self.instruction_area = QRect()
+        
+    def refresh_background(self):
+        """覆盖整个虚拟桌面，逐个屏幕按各自的DPI截取背景"""
+        screens = QApplication.screens()
+        virtual_geometry = QApplication.primaryScreen().virtualGeometry()
+        if virtual_geometry != self.screen_geometry:
+            # 不使用全屏窗口状态，全屏只会覆盖一个屏幕
+            self.screen_geometry = virtual_geometry
+            self.setGeometry(self.screen_geometry)
+        
+        # QScreen截屏只能在GUI线程调用，逐个屏幕截取
+        origin = virtual_geometry.topLeft()
+        self.screen_grabs = [
+            ScreenGrab(screen.geometry().translated(-origin), screen.grabWindow(0))
+            for screen in screens
+        ]
         
-        # 截取屏幕背景
-        self.background_pixmap = screen.grabWindow(0)
+        # 提示文字显示在鼠标所在的屏幕中央
+        cursor_screen = QApplication.screenAt(QCursor.pos()) or QApplication.primaryScreen()
+        self.instruction_area = cursor_screen.geometry().translated(-origin)
         
     def setup_variables(self):
         """设置变量"""
+        # 选区稳定检测，0表示不启用
+        self.speculative_delay_ms = 0
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.timeout.connect(self.on_selection_settled)
+        
+        self.reset_selection()
+        
+        # 绘制缓存：尺寸信息字体、提示文字图层
+        self.info_font = QFont("Microsoft YaHei", 10, QFont.Weight.Medium)
+        self.info_metrics = QFontMetrics(self.info_font)
+        self.text_layer_cache = {}
+        
+        # 控制面板相关
+        self.control_panel = None
+        self.show_control_panel = False
+        
+        # 延迟统计：快捷键触发时间、截屏完成时间
+        self.trigger_time = None
+        self.grab_finished_time = None
+        self.first_paint_pending = False
+        
+    def reset_selection(self):
+        """重置选择状态"""
         self.is_selecting = False
         self.selection_start = QPoint()
         self.selection_end = QPoint()
         self.current_rect = QRect()
         self.is_dragging = False
+        self.settle_timer.stop()
+        self.settled_rect = QRect()
+        self.settled_image = None
+        self.settled_device_pixel_ratio = None
+        
+    def on_selection_settled(self):
+        """选区保持不变，提前裁剪并通知外部开始识别"""
+        if self.current_rect.isEmpty() or self.is_selecting:
+            return
+        try:
+            self.settled_image, self.settled_device_pixel_ratio = self._crop_selection_from_background()
+            self.settled_rect = QRect(self.current_rect)
+            self.selection_settled.emit(self.settled_image)
+        except Exception as e:
+            logging.warning(f"提前裁剪选区失败: {e}")
+        
+    def discard_settled_selection(self):
+        """选区被修改，作废已提前裁剪的截图"""
+        self.settle_timer.stop()
+        if self.settled_image is not None:
+            self.settled_rect = QRect()
+            self.settled_image = None
+            self.selection_changed.emit()
+        
+    def activate(self, trigger_time: float = None):
+        """激活覆盖层：刷新背景截图、重置选择状态并显示
+
+        trigger_time 为快捷键触发时的 time.perf_counter()，用于统计从快捷键到首帧的耗时。
+        """
+        self.trigger_time = trigger_time or time.perf_counter()
+        self.refresh_background()
+        self.grab_finished_time = time.perf_counter()
         
-        # 控制面板相关
-        self.control_panel = None
-        self.show_control_panel = False
+        self.reset_selection()
+        self.hide_control_panel()
+        self.first_paint_pending = True
+        
+        self.show()
+        self.raise_()
+        self.activateWindow()
         
     def setup_shortcuts(self):
         """设置快捷键"""
@@ -82,6 +203,7 @@ class ScreenshotOverlay(QWidget):
     def mousePressEvent(self, event):
         """鼠标按下事件"""
         if event.button() == Qt.MouseButton.LeftButton:
+            self.discard_settled_selection()
             self.is_selecting = True
             self.selection_start = event.pos()
             self.selection_end = event.pos()
@@ -92,9 +214,10 @@ class ScreenshotOverlay(QWidget):
     def mouseMoveEvent(self, event):
         """鼠标移动事件"""
         if self.is_selecting:
+            old_rect, old_region = self.current_rect, self.selection_dirty_region()
             self.selection_end = event.pos()
             self.current_rect = QRect(self.selection_start, self.selection_end).normalized()
-            self.update()
+            self.update_selection(old_rect, old_region)
             
     def mouseReleaseEvent(self, event):
         """鼠标释放事件"""
@@ -113,6 +236,9 @@ class ScreenshotOverlay(QWidget):
             self.show_control_panel_at_selection()
             self.update()
             
+            if self.speculative_delay_ms > 0:
+                self.settle_timer.start(self.speculative_delay_ms)
+            
     def mouseDoubleClickEvent(self, event):
         """鼠标双击事件 - 快速确认"""
         if not self.current_rect.isEmpty():
@@ -128,16 +254,16 @@ class ScreenshotOverlay(QWidget):
         super().keyPressEvent(event)
         
     def paintEvent(self, event):
-        """绘制事件"""
+        """绘制事件，只重绘脏区域"""
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        dirty_rect = event.rect()
         
-        # 绘制背景（半透明遮罩）
-        painter.drawPixmap(0, 0, self.background_pixmap)
-        
-        # 绘制遮罩层
-        overlay_color = QColor(0, 0, 0, 120)  # 半透明黑色
-        painter.fillRect(self.rect(), overlay_color)
+        # 绘制预先变暗的背景（半透明遮罩已合成在内）
+        for grab in self.screen_grabs:
+            area = dirty_rect.intersected(grab.rect)
+            if not area.isEmpty():
+                painter.drawPixmap(area, grab.dimmed_pixmap, grab.to_device_rect(area))
         
         # 如果有选择区域，绘制选择框
         if not self.current_rect.isEmpty():
@@ -147,14 +273,35 @@ class ScreenshotOverlay(QWidget):
             # 绘制初始提示信息
             self.draw_instructions(painter)
         
+        if self.first_paint_pending:
+            self.first_paint_pending = False
+            now = time.perf_counter()
+            logging.info(
+                f"截图覆盖层首帧: 触发到首帧 {(now - self.trigger_time) * 1000:.1f}ms，"
+                f"其中截屏 {(self.grab_finished_time - self.trigger_time) * 1000:.1f}ms"
+            )
+        
+    def selection_dirty_region(self) -> QRegion:
+        """当前选择框（含边框）和尺寸信息所占的区域"""
+        if self.current_rect.isEmpty():
+            return QRegion()
+        region = QRegion(self.current_rect.adjusted(-3, -3, 3, 3))
+        return region.united(QRegion(self.get_info_rect()[0].adjusted(-2, -2, 3, 3)))
+        
+    def update_selection(self, old_rect: QRect, old_region: QRegion):
+        """选择框变化后只刷新新旧选择框的并集，空与非空切换时提示文字也要变，整体刷新"""
+        if old_rect.isEmpty() != self.current_rect.isEmpty():
+            self.update()
+        else:
+            self.update(old_region.united(self.selection_dirty_region()))
+        
     def draw_selection_area(self, painter):
         """绘制选择区域"""
-        # 清除选择区域的遮罩，显示原始截图
-        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Clear)
-        painter.fillRect(self.current_rect, QColor(0, 0, 0, 0))
-        
-        # 恢复正常绘制模式
-        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+        # 选择区域内直接绘制原始截图，不带遮罩
+        for grab in self.screen_grabs:
+            area = self.current_rect.intersected(grab.rect)
+            if not area.isEmpty():
+                painter.drawPixmap(area, grab.pixmap, grab.to_device_rect(area))
         
         # 绘制选择框边框
         pen = QPen(QColor(0, 120, 215), 2)  # Windows蓝色
@@ -164,23 +311,14 @@ class ScreenshotOverlay(QWidget):
         # 绘制选择框信息
         self.draw_selection_info(painter)
         
-    def draw_selection_info(self, painter):
-        """绘制选择框信息"""
-        if self.current_rect.isEmpty():
-            return
-            
-        # 设置字体（缩小字体）
-        font = QFont("Microsoft YaHei", 10, QFont.Weight.Medium)
-        painter.setFont(font)
-        
-        # 准备信息文本
+    def get_info_rect(self):
+        """计算尺寸信息的位置，返回 (背景矩形, 文字x, 文字y, 文字)"""
         width = self.current_rect.width()
         height = self.current_rect.height()
         info_text = f"{width} × {height}"
         
         # 计算文本位置
-        fm = QFontMetrics(font)
-        text_rect = fm.boundingRect(info_text)
+        text_rect = self.info_metrics.boundingRect(info_text)
         
         # 放置在选择框外的右下角，距离选择框15像素
         info_x = self.current_rect.right() + 15
@@ -201,11 +339,19 @@ class ScreenshotOverlay(QWidget):
         if info_y < 10:
             info_y = 10
             
-        # 绘制信息背景（缩小的圆角矩形）
         info_bg_rect = QRect(
             info_x - 8, info_y - 6,
             text_rect.width() + 16, text_rect.height() + 12
         )
+        return info_bg_rect, info_x, info_y + text_rect.height(), info_text
+        
+    def draw_selection_info(self, painter):
+        """绘制选择框信息"""
+        if self.current_rect.isEmpty():
+            return
+            
+        painter.setFont(self.info_font)
+        info_bg_rect, text_x, text_y, info_text = self.get_info_rect()
         
         # 绘制背景阴影
         shadow_rect = QRect(info_bg_rect.x() + 1, info_bg_rect.y() + 1, 
@@ -221,11 +367,30 @@ class ScreenshotOverlay(QWidget):
         
         # 绘制文本阴影
         painter.setPen(QPen(QColor(0, 0, 0, 120)))
-        painter.drawText(info_x + 1, info_y + text_rect.height() + 1, info_text)
+        painter.drawText(text_x + 1, text_y + 1, info_text)
         
         # 绘制信息文本
         painter.setPen(QPen(QColor(255, 255, 255, 255)))
-        painter.drawText(info_x, info_y + text_rect.height(), info_text)
+        painter.drawText(text_x, text_y, info_text)
+        
+    def get_cached_text_layer(self, name: str, bounds: QRect, render):
+        """获取缓存的提示文字图层，不存在时调用render在透明图层上绘制一次"""
+        cached = self.text_layer_cache.get(name)
+        if cached is None or cached[0] != bounds:
+            device_pixel_ratio = self.devicePixelRatioF()
+            layer = QPixmap(bounds.size() * device_pixel_ratio)
+            layer.setDevicePixelRatio(device_pixel_ratio)
+            layer.fill(Qt.GlobalColor.transparent)
+            
+            painter = QPainter(layer)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.translate(-bounds.topLeft())
+            render(painter)
+            painter.end()
+            
+            cached = (bounds, layer)
+            self.text_layer_cache[name] = cached
+        return cached[1]
         
     def draw_instructions(self, painter):
         """绘制操作提示"""
@@ -233,10 +398,6 @@ class ScreenshotOverlay(QWidget):
         if not self.current_rect.isEmpty():
             return
             
-        # 设置字体
-        font = QFont("Microsoft YaHei", 14, QFont.Weight.Medium)
-        painter.setFont(font)
-        
         # 准备提示文本（只在未选择时显示）
         instructions = [
             "拖拽鼠标选择截图区域",
@@ -244,65 +405,64 @@ class ScreenshotOverlay(QWidget):
         ]
             
         # 计算所有文本的总高度，用于垂直居中
+        font = QFont("Microsoft YaHei", 14, QFont.Weight.Medium)
         fm = QFontMetrics(font)
-        total_height = 0
-        text_rects = []
-        
-        for instruction in instructions:
-            text_rect = fm.boundingRect(instruction)
-            text_rects.append(text_rect)
-            total_height += text_rect.height() + 20  # 20是行间距
-        
-        total_height -= 20  # 减去最后一行的行间距
+        text_rects = [fm.boundingRect(instruction) for instruction in instructions]
+        total_height = sum(text_rect.height() + 20 for text_rect in text_rects) - 20  # 20是行间距，减去最后一行的行间距
         
         # 计算起始Y位置（垂直居中）
-        start_y = (self.height() - total_height) // 2
+        area = self.instruction_area
+        start_y = area.y() + (area.height() - total_height) // 2
+        max_width = max(text_rect.width() for text_rect in text_rects)
+        bounds = QRect(
+            area.x() + (area.width() - max_width) // 2 - 15, start_y - 5,
+            max_width + 33, total_height + 23
+        )
         
-        # 绘制每行文本
-        y_offset = start_y
-        for i, instruction in enumerate(instructions):
-            text_rect = text_rects[i]
-            
-            # 计算水平居中位置
-            x = (self.width() - text_rect.width()) // 2
+        def render(layer_painter):
+            layer_painter.setFont(font)
             
-            # 绘制文本阴影（多层阴影效果）
-            shadow_offsets = [(2, 2), (1, 1), (3, 3)]
-            shadow_colors = [QColor(0, 0, 0, 180), QColor(0, 0, 0, 120), QColor(0, 0, 0, 60)]
-            
-            for offset, shadow_color in zip(shadow_offsets, shadow_colors):
-                painter.setPen(QPen(shadow_color))
-                painter.drawText(x + offset[0], y_offset + text_rect.height() + offset[1], instruction)
-            
-            # 绘制文本背景（圆角矩形，更好的视觉效果）
-            bg_rect = QRect(
-                x - 15, y_offset - 5,
-                text_rect.width() + 30, text_rect.height() + 15
-            )
-            
-            # 绘制背景阴影
-            shadow_rect = QRect(bg_rect.x() + 3, bg_rect.y() + 3, bg_rect.width(), bg_rect.height())
-            painter.fillRect(shadow_rect, QColor(0, 0, 0, 100))
-            
-            # 绘制背景（渐变效果）
-            painter.fillRect(bg_rect, QColor(0, 0, 0, 200))
-            
-            # 绘制背景边框
-            painter.setPen(QPen(QColor(255, 255, 255, 80), 1))
-            painter.drawRoundedRect(bg_rect, 8, 8)
-            
-            # 绘制主文本（白色）
-            painter.setPen(QPen(QColor(255, 255, 255, 255)))
-            painter.drawText(x, y_offset + text_rect.height(), instruction)
-            
-            y_offset += text_rect.height() + 20
+            # 绘制每行文本
+            y_offset = start_y
+            for instruction, text_rect in zip(instructions, text_rects):
+                # 计算水平居中位置
+                x = area.x() + (area.width() - text_rect.width()) // 2
+                
+                # 绘制文本阴影（多层阴影效果）
+                shadow_offsets = [(2, 2), (1, 1), (3, 3)]
+                shadow_colors = [QColor(0, 0, 0, 180), QColor(0, 0, 0, 120), QColor(0, 0, 0, 60)]
+                
+                for offset, shadow_color in zip(shadow_offsets, shadow_colors):
+                    layer_painter.setPen(QPen(shadow_color))
+                    layer_painter.drawText(x + offset[0], y_offset + text_rect.height() + offset[1], instruction)
+                
+                # 绘制文本背景（圆角矩形，更好的视觉效果）
+                bg_rect = QRect(
+                    x - 15, y_offset - 5,
+                    text_rect.width() + 30, text_rect.height() + 15
+                )
+                
+                # 绘制背景阴影
+                shadow_rect = QRect(bg_rect.x() + 3, bg_rect.y() + 3, bg_rect.width(), bg_rect.height())
+                layer_painter.fillRect(shadow_rect, QColor(0, 0, 0, 100))
+                
+                # 绘制背景（渐变效果）
+                layer_painter.fillRect(bg_rect, QColor(0, 0, 0, 200))
+                
+                # 绘制背景边框
+                layer_painter.setPen(QPen(QColor(255, 255, 255, 80), 1))
+                layer_painter.drawRoundedRect(bg_rect, 8, 8)
+                
+                # 绘制主文本（白色）
+                layer_painter.setPen(QPen(QColor(255, 255, 255, 255)))
+                layer_painter.drawText(x, y_offset + text_rect.height(), instruction)
+                
+                y_offset += text_rect.height() + 20
+        
+        painter.drawPixmap(bounds.topLeft(), self.get_cached_text_layer("instructions", bounds, render))
              
     def draw_selection_instructions(self, painter):
         """绘制选择区域时的操作提示"""
-        # 设置字体
-        font = QFont("Microsoft YaHei", 13, QFont.Weight.Medium)
-        painter.setFont(font)
-        
         # 准备提示文本
         instructions = [
             "双击或按 Enter/Space 确认截图",
@@ -310,39 +470,52 @@ class ScreenshotOverlay(QWidget):
         ]
         
         # 计算文本位置（屏幕顶部居中）
+        font = QFont("Microsoft YaHei", 13, QFont.Weight.Medium)
         fm = QFontMetrics(font)
-        y_offset = 25
+        text_rects = [fm.boundingRect(instruction) for instruction in instructions]
+        total_height = sum(text_rect.height() + 15 for text_rect in text_rects) - 15
+        max_width = max(text_rect.width() for text_rect in text_rects)
+        area = self.instruction_area
+        bounds = QRect(
+            area.x() + (area.width() - max_width) // 2 - 12, area.y() + 25 - 6,
+            max_width + 26, total_height + 14
+        )
         
-        for instruction in instructions:
-            text_rect = fm.boundingRect(instruction)
-            x = (self.width() - text_rect.width()) // 2
-            
-            # 绘制文本背景（不遮挡选择区域）
-            bg_rect = QRect(
-                x - 12, y_offset - 6,
-                text_rect.width() + 24, text_rect.height() + 12
-            )
-            
-            # 绘制背景阴影
-            shadow_rect = QRect(bg_rect.x() + 2, bg_rect.y() + 2, bg_rect.width(), bg_rect.height())
-            painter.fillRect(shadow_rect, QColor(0, 0, 0, 100))
-            
-            # 绘制背景
-            painter.fillRect(bg_rect, QColor(0, 0, 0, 180))
-            
-            # 绘制背景边框
-            painter.setPen(QPen(QColor(255, 255, 255, 60), 1))
-            painter.drawRoundedRect(bg_rect, 6, 6)
+        def render(layer_painter):
+            layer_painter.setFont(font)
+            y_offset = area.y() + 25
             
-            # 绘制文本阴影
-            painter.setPen(QPen(QColor(0, 0, 0, 150)))
-            painter.drawText(x + 1, y_offset + text_rect.height() + 1, instruction)
-            
-            # 绘制主文本
-            painter.setPen(QPen(QColor(255, 255, 255, 255)))
-            painter.drawText(x, y_offset + text_rect.height(), instruction)
-            
-            y_offset += text_rect.height() + 15
+            for instruction, text_rect in zip(instructions, text_rects):
+                x = area.x() + (area.width() - text_rect.width()) // 2
+                
+                # 绘制文本背景（不遮挡选择区域）
+                bg_rect = QRect(
+                    x - 12, y_offset - 6,
+                    text_rect.width() + 24, text_rect.height() + 12
+                )
+                
+                # 绘制背景阴影
+                shadow_rect = QRect(bg_rect.x() + 2, bg_rect.y() + 2, bg_rect.width(), bg_rect.height())
+                layer_painter.fillRect(shadow_rect, QColor(0, 0, 0, 100))
+                
+                # 绘制背景
+                layer_painter.fillRect(bg_rect, QColor(0, 0, 0, 180))
+                
+                # 绘制背景边框
+                layer_painter.setPen(QPen(QColor(255, 255, 255, 60), 1))
+                layer_painter.drawRoundedRect(bg_rect, 6, 6)
+                
+                # 绘制文本阴影
+                layer_painter.setPen(QPen(QColor(0, 0, 0, 150)))
+                layer_painter.drawText(x + 1, y_offset + text_rect.height() + 1, instruction)
+                
+                # 绘制主文本
+                layer_painter.setPen(QPen(QColor(255, 255, 255, 255)))
+                layer_painter.drawText(x, y_offset + text_rect.height(), instruction)
+                
+                y_offset += text_rect.height() + 15
+        
+        painter.drawPixmap(bounds.topLeft(), self.get_cached_text_layer("selection_instructions", bounds, render))
             
     def show_control_panel_at_selection(self):
         """在选择区域附近显示控制面板"""
@@ -383,24 +556,15 @@ class ScreenshotOverlay(QWidget):
             return
             
         try:
-            # 获取屏幕信息
-            screen = QApplication.primaryScreen()
-            device_pixel_ratio = screen.devicePixelRatio()
-            
-            # 截取选择区域 - 考虑DPI缩放
-            x = int(self.current_rect.x() * device_pixel_ratio)
-            y = int(self.current_rect.y() * device_pixel_ratio)
-            width = int(self.current_rect.width() * device_pixel_ratio)
-            height = int(self.current_rect.height() * device_pixel_ratio)
-            
-            # 使用PIL截取指定区域
-            screenshot = ImageGrab.grab(bbox=(x, y, x + width, y + height))
-            
-            # 如果DPI缩放不是1，需要调整图片大小回到原始尺寸
-            if device_pixel_ratio != 1.0:
-                original_width = self.current_rect.width()
-                original_height = self.current_rect.height()
-                screenshot = screenshot.resize((original_width, original_height), Image.LANCZOS)
+            self.settle_timer.stop()
+            if self.settled_image is not None and self.settled_rect == self.current_rect:
+                # 选区稳定时已经裁剪过，直接使用同一张图片，提前开始的识别结果可以复用
+                screenshot, device_pixel_ratio = self.settled_image, self.settled_device_pixel_ratio
+            elif not self.screen_grabs:
+                screenshot, device_pixel_ratio = self._grab_selection_from_screen()
+            else:
+                # 优先从覆盖层的背景截图中裁剪，避免再次截取整个屏幕
+                screenshot, device_pixel_ratio = self._crop_selection_from_background()
             
             if screenshot:
                 logging.info(f"截图确认: {self.current_rect.width()}x{self.current_rect.height()} at ({self.current_rect.x()}, {self.current_rect.y()}), DPI: {device_pixel_ratio}")
@@ -414,15 +578,59 @@ class ScreenshotOverlay(QWidget):
         finally:
             self.close()
             
+    def _crop_selection_from_background(self):
+        """从背景截图中按物理像素裁剪选择区域
+
+        选择区域只在一个屏幕内时直接裁剪，不重采样；跨屏时以其中最高的DPI为准拼接，
+        较低DPI屏幕上的部分放大后贴入。
+        """
+        parts = [
+            (grab, self.current_rect.intersected(grab.rect))
+            for grab in self.screen_grabs
+            if grab.rect.intersects(self.current_rect)
+        ]
+        if len(parts) == 1:
+            grab, area = parts[0]
+            return qimage_to_pil(grab.pixmap.copy(grab.to_device_rect(area)).toImage()), grab.device_pixel_ratio
+        
+        device_pixel_ratio = max(grab.device_pixel_ratio for grab, _ in parts)
+        screenshot = Image.new("RGB", (
+            round(self.current_rect.width() * device_pixel_ratio),
+            round(self.current_rect.height() * device_pixel_ratio)
+        ))
+        for grab, area in parts:
+            part = qimage_to_pil(grab.pixmap.copy(grab.to_device_rect(area)).toImage())
+            size = (round(area.width() * device_pixel_ratio), round(area.height() * device_pixel_ratio))
+            if part.size != size:
+                part = part.resize(size, Image.LANCZOS)
+            offset = area.topLeft() - self.current_rect.topLeft()
+            screenshot.paste(part, (round(offset.x() * device_pixel_ratio), round(offset.y() * device_pixel_ratio)))
+        return screenshot, device_pixel_ratio
+    
+    def _grab_selection_from_screen(self):
+        """背景截图不可用时，重新截取屏幕上的选择区域"""
+        device_pixel_ratio = QApplication.primaryScreen().devicePixelRatio()
+        # 截取所有屏幕时图片以虚拟桌面左上角为原点，与覆盖层坐标一致
+        rect = self.current_rect
+        left = round(rect.x() * device_pixel_ratio)
+        top = round(rect.y() * device_pixel_ratio)
+        screenshot = ImageGrab.grab(bbox=(
+            left, top,
+            left + round(rect.width() * device_pixel_ratio), top + round(rect.height() * device_pixel_ratio)
+        ), all_screens=True)
+        return screenshot, device_pixel_ratio
+    
     def cancel_screenshot(self):
         """取消截图"""
         logging.info("截图已取消")
+        self.settle_timer.stop()
         self.screenshot_cancelled.emit()
         self.close()
         
     def closeEvent(self, event):
-        """关闭事件"""
+        """关闭事件，覆盖层会被复用，这里只释放背景截图"""
         self.hide_control_panel()
+        self.screen_grabs = []
         super().closeEvent(event)
 
 
@@ -484,44 +692,45 @@ class ScreenshotControlPanel(QFrame):
 
 
 class AdvancedScreenshotManager:
-    """高级截图管理器"""
+    """高级截图管理器
+
+    覆盖层在启动时创建一次并保持隐藏，每次截图只刷新背景和选择状态后显示。
+    """
     
     def __init__(self, config_manager):
         self.config_manager = config_manager
         self.overlay = None
         
-    def start_screenshot(self) -> None:
-        """开始截图"""
-        try:
-            # 如果已有覆盖层，先关闭并清理
-            if self.overlay:
-                try:
-                    self.overlay.screenshot_confirmed.disconnect()
-                    self.overlay.screenshot_cancelled.disconnect()
-                except:
-                    pass
-                self.overlay.close()
-                self.overlay = None
-                
-            # 创建新的覆盖层
+    def prewarm(self) -> ScreenshotOverlay:
+        """预先创建覆盖层，需在QApplication创建之后调用"""
+        if self.overlay is None:
             self.overlay = ScreenshotOverlay()
-            
-            # 连接信号
             self.overlay.screenshot_confirmed.connect(self._on_screenshot_confirmed)
             self.overlay.screenshot_cancelled.connect(self._on_screenshot_cancelled)
+            logging.info("截图覆盖层已预创建")
+        return self.overlay
+        
+    def start_screenshot(self, trigger_time: float = None) -> None:
+        """开始截图"""
+        try:
+            overlay = self.prewarm()
+            if overlay.isVisible():
+                # 正在截图中，不重复截取
+                overlay.raise_()
+                overlay.activateWindow()
+                return
             
-            # 显示覆盖层
-            self.overlay.show()
-            self.overlay.raise_()
-            self.overlay.activateWindow()
-            
+            if self.config_manager and self.config_manager.get_config("screenshot.speculative_ocr"):
+                overlay.speculative_delay_ms = int(self.config_manager.get_config("screenshot.speculative_delay_ms") or 300)
+            else:
+                overlay.speculative_delay_ms = 0
+            overlay.activate(trigger_time)
             logging.info("高级截图模式已启动")
             
         except Exception as e:
             logging.error(f"启动截图失败: {e}")
             if self.overlay:
                 self.overlay.close()
-                self.overlay = None
             
     def _on_screenshot_confirmed(self, screenshot):
         """截图确认回调"""
@@ -536,4 +745,5 @@ class AdvancedScreenshotManager:
         """清理资源"""
         if self.overlay:
             self.overlay.close()
-            self.overlay = None
\ No newline at end of file
+            self.overlay.deleteLater()
+            self.overlay = None
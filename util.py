@@ -6,13 +6,22 @@ AI截图分析工具模块
 """
 
 import os
+import json
 import logging
 import time
 import glob
+import socket
+import threading
 from datetime import datetime
-from typing import Dict, Any, Optional
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Iterable, Callable, List
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
 from PyQt6.QtWidgets import QMessageBox
-from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
 
 try:
     import tomllib
@@ -50,7 +59,8 @@ class ConfigManager(QObject):
                 "max_tokens": 0,  # 最大令牌数，0表示使用模型默认值
                 "temperature": 0.3,  # 生成温度，控制回答的随机性(0-2)
                 "vision_support": False,  # 是否支持图像输入
-                "enable_streaming": True  # 是否启用流式响应
+                "enable_streaming": True,  # 是否启用流式响应
+                "max_image_pixels": 0  # 上传图片的最大像素数，0表示使用截图质量档位的默认值
             },
             # 提示词配置 - 预定义的AI交互提示词模板
             "prompts": [
@@ -77,7 +87,7 @@ class ConfigManager(QObject):
             ],
             # OCR配置 - 光学字符识别相关设置
             "ocr": {
-                "engine": "vision_model",  # OCR引擎类型：xinyew(新野OCR)、tencent(腾讯云OCR)、vision_model(AI视觉模型)
+                "engine": "vision_model",  # OCR引擎类型：xinyew(新野OCR)、tencent(腾讯云OCR)、vision_model(AI视觉模型)、local(本地OCR)、race(多引擎竞速)
                 "type": "ocr_then_text",  # 处理类型：ocr_then_text(先OCR再分析)、direct_vision(直接视觉分析)
                 # 腾讯云OCR配置
                 "tencent": {
@@ -94,7 +104,37 @@ class ConfigManager(QObject):
                     "api_key": "sk-example-key",  # API密钥
                     "max_tokens": 4096,  # 最大令牌数
                     "temperature": 0.1,  # 生成温度，OCR任务使用较低温度
-                    "prompt": "请识别图片中的文字内容，并格式化后给我。只返回识别到的文字，不要添加任何解释或说明。"  # OCR专用提示词
+                    "prompt": "请识别图片中的文字内容，并格式化后给我。只返回识别到的文字，不要添加任何解释或说明。",  # OCR专用提示词
+                    "max_image_pixels": 0  # 上传图片的最大像素数，0表示使用截图质量档位的默认值
+                },
+                # OCR预处理配置
+                "preprocess": {
+                    "enabled": True,  # 是否在OCR前预处理图片
+                    "engines": ["tencent", "xinyew", "vision_model", "local"],  # 需要预处理的引擎
+                    "trim": True,  # 裁掉四周空白边距
+                    "invert_dark": True,  # 深色主题截图反色为白底黑字
+                    "binarize_engines": [],  # 需要自适应二值化的引擎
+                    "upscale_below": 48  # 裁剪后高度低于该值(像素)时放大，0表示不放大
+                },
+                # 本地OCR配置
+                "local": {
+                    "workers": 2,  # 本地OCR进程数
+                    "warmup": True,  # 启动时预加载模型
+                    "timeout": 30  # 单次识别超时时间(秒)
+                },
+                # 多引擎竞速配置
+                "race": {
+                    "engines": ["vision_model", "xinyew"],  # 参与竞速的引擎，按优先级排列
+                    "hedged": False,  # 对冲模式：先启动第一个引擎，超过延迟仍未返回再启动其余引擎
+                    "hedge_delay_ms": 0,  # 对冲延迟(毫秒)，0表示使用第一个引擎历史耗时的中位数
+                    "min_confidence": 0.0  # 最低置信度(0-1)，仅对提供置信度的引擎（腾讯云）生效
+                },
+                # 长截图分块识别配置
+                "tiling": {
+                    "enabled": True,  # 是否把过高的截图切块后并发识别
+                    "max_tile_height": 1600,  # 每块最大高度(像素)，截图高于该值时切块
+                    "overlap": 64,  # 找不到空白行时相邻块的重叠高度(像素)
+                    "workers": 4  # 并发识别的块数
                 }
             },
             # 通知配置 - 结果展示方式设置
@@ -115,8 +155,45 @@ class ConfigManager(QObject):
             },
             # 截图配置 - 截图质量和格式设置
             "screenshot": {
-                "quality": "high",  # 截图质量：high(高质量)、medium(中等)、low(低质量)
-                "format": "PNG"  # 截图格式：PNG、JPEG
+                "quality": "high",  # 上传质量档位：high(高质量)、medium(中等)、low(低质量)，决定像素预算和字节预算
+                "format": "auto",  # 上传格式：auto(按内容自动选择)、PNG、JPEG、WEBP
+                "speculative_ocr": True,  # 选区停止调整后，在确认前提前开始OCR
+                "speculative_delay_ms": 300  # 选区保持不变多久(毫秒)后开始提前OCR
+            },
+            # 任务配置 - 连续截图时的并发设置
+            "task": {
+                "max_concurrent": 3,  # 同时进行的分析任务数
+                "max_queued": 5,  # 超出并发数时最多排队等待的任务数
+                "max_workers": 6  # OCR与AI请求共用的后台线程数，即同时进行的外发请求上限
+            },
+            # 网络配置 - HTTP连接池设置
+            "network": {
+                "pool_connections": 8,  # 连接池数量（每个端点一个连接池）
+                "pool_maxsize": 16,  # 每个连接池保持的最大连接数
+                "prewarm": True,  # 加载配置后是否预先建立到各端点的空闲连接
+                "engine": "requests",  # 网络引擎：requests(每个请求一个线程)、asyncio(事件循环+HTTP/2多路复用，需安装httpx)
+                "http2": True  # asyncio引擎是否启用HTTP/2（需安装h2）
+            },
+            # 内置服务配置 - 内置AI代理服务的运行方式
+            "server": {
+                "mode": "wsgi",  # 运行方式：wsgi(多线程)、asgi(事件循环，流式回答不占线程，需安装httpx和uvicorn)
+                "host": "127.0.0.1",  # 监听地址，设为0.0.0.0可供局域网内其他电脑共用
+                "threads": 16,  # 工作线程数，即同时处理的请求数
+                "keepalive_timeout": 120  # 空闲的keep-alive连接保持时间(秒)
+            },
+            # 缓存配置 - 识别结果缓存设置
+            "cache": {
+                "dir": "cache",  # 缓存目录
+                "ocr_enabled": True,  # 是否缓存OCR结果，相同截图直接复用
+                "ocr_max_entries": 500,  # OCR缓存最大条目数
+                "ocr_max_size_mb": 50,  # OCR缓存最大占用空间(MB)
+                "near_duplicate": "off",  # 近似截图复用：off(关闭)、ask(询问)、auto(自动使用)
+                "phash_threshold": 3,  # 感知哈希汉明距离阈值(0-64)，越小越严格
+                "phash_max_entries": 200,  # 近似截图索引最大条目数
+                "ai_enabled": True,  # 是否缓存AI回答，相同问题直接返回
+                "ai_ttl_seconds": 3600,  # AI回答缓存有效期(秒)
+                "ai_max_entries": 100,  # AI回答缓存最大条目数
+                "ai_max_temperature": 0.5  # 生成温度高于该值时不使用AI回答缓存
             },
             # 日志配置 - 应用程序日志记录设置
             "logging": {
@@ -241,6 +318,10 @@ vision_support = {ai_vision_support}
 # 秘塔AI请填false，响应速度较快的模型也推荐填false。深度思考一定填true。
 enable_streaming = {ai_enable_streaming}
 
+# ◆ 上传图片的最大像素数（宽×高），超出时等比缩小
+# 0表示使用截图质量档位的默认值
+max_image_pixels = {ai_max_image_pixels}
+
 # ==================== 提示词配置 ====================
 # ◆ 预定义的AI交互提示词模板，可根据不同场景，在软件内使用
 {prompts_section}
@@ -256,6 +337,8 @@ type = "{ocr_type}"
 # - xinyew: 新野OCR（免费，推荐）
 # - tencent: 腾讯云OCR（需要配置密钥）
 # - vision_model: AI视觉模型OCR
+# - local: 本地OCR（离线，需要安装 rapidocr_onnxruntime）
+# - race: 多引擎竞速，同时使用多个引擎，采用最先返回的有效结果（见[ocr.race]）
 engine = "{ocr_engine}"
 
 [ocr.tencent]
@@ -292,6 +375,61 @@ max_tokens = {vision_max_tokens}
 temperature = {vision_temperature}
 # ◆ OCR专用提示词
 prompt = "{vision_prompt}"
+# ◆ 上传图片的最大像素数（宽×高），0表示使用截图质量档位的默认值
+max_image_pixels = {vision_max_image_pixels}
+
+[ocr.preprocess]
+# OCR预处理配置：裁掉空白边距、深色主题反色等，可减小上传体积并提高识别率
+
+# ◆ 是否启用预处理
+enabled = {preprocess_enabled}
+# ◆ 需要预处理的引擎，可选：xinyew、tencent、vision_model、local
+engines = {preprocess_engines}
+# ◆ 裁掉四周与背景色相同的空白边距
+trim = {preprocess_trim}
+# ◆ 深色主题截图反色为白底黑字
+invert_dark = {preprocess_invert_dark}
+# ◆ 需要自适应二值化的引擎，传统OCR引擎在低对比度截图上可开启，视觉模型不建议开启
+binarize_engines = {preprocess_binarize_engines}
+# ◆ 裁剪后高度低于该值(像素)时放大，便于识别小字，0表示不放大
+upscale_below = {preprocess_upscale_below}
+
+[ocr.local]
+# 本地OCR配置（仅当engine=local或竞速引擎包含local时需要）
+# 在后台常驻进程中运行本地模型，无需网络，需要先 pip install rapidocr_onnxruntime
+
+# ◆ 本地OCR进程数，长截图分块识别时可并行处理多块
+workers = {local_workers}
+# ◆ 启动时预加载模型，避免首次识别等待
+warmup = {local_warmup}
+# ◆ 单次识别超时时间(秒)
+timeout = {local_timeout}
+
+[ocr.race]
+# 多引擎竞速配置（仅当engine=race时需要）
+# 每个参与的引擎都需要配置好，腾讯云引擎会消耗调用次数
+
+# ◆ 参与竞速的引擎，按优先级排列，可选：xinyew、tencent、vision_model、local
+# 远程引擎较慢时可使用 hedged 模式并把 local 放在后面作为兜底
+engines = {race_engines}
+# ◆ 对冲模式：先启动第一个引擎，超过延迟仍未返回再启动其余引擎，可减少重复调用
+hedged = {race_hedged}
+# ◆ 对冲延迟(毫秒)，0表示使用第一个引擎历史耗时的中位数
+hedge_delay_ms = {race_hedge_delay_ms}
+# ◆ 最低置信度(0-1)，仅对提供置信度的引擎（腾讯云）生效
+min_confidence = {race_min_confidence}
+
+[ocr.tiling]
+# 长截图分块识别配置：过高的截图会在空白行处切成多块并发识别，再按顺序拼接
+
+# ◆ 是否启用分块识别
+enabled = {tiling_enabled}
+# ◆ 每块最大高度(像素)，截图高于该值时切块
+max_tile_height = {tiling_max_tile_height}
+# ◆ 找不到空白行时相邻块的重叠高度(像素)
+overlap = {tiling_overlap}
+# ◆ 并发识别的块数
+workers = {tiling_workers}
 
 # ==================== 通知配置 ====================
 [notification]
@@ -335,12 +473,93 @@ screenshot = "{hotkey_screenshot}"
 
 # ==================== 截图配置 ====================
 [screenshot]
-# 截图质量和格式设置
+# 上传前的图片压缩设置
 
-# ◆ 截图质量：high(高质量)、medium(中等)、low(低质量)
+# ◆ 上传质量档位：high(高质量)、medium(中等)、low(低质量)
+# 档位决定图片的最大像素数和字节预算，网络较慢时推荐medium或low
 quality = "{screenshot_quality}"
-# ◆ 截图格式：PNG、JPEG
+# ◆ 上传格式：
+# - auto: 按内容自动选择，文字截图使用PNG，照片或超出预算时使用有损压缩（推荐）
+# - PNG、JPEG、WEBP: 固定使用指定格式
 format = "{screenshot_format}"
+# ◆ 选区停止调整后，在按下确认前提前开始OCR，确认时结果往往已经返回
+# 提前识别后取消截图也会消耗一次OCR调用（腾讯云引擎会计入调用次数）
+speculative_ocr = {screenshot_speculative_ocr}
+# ◆ 选区保持不变多久(毫秒)后开始提前OCR
+speculative_delay_ms = {screenshot_speculative_delay_ms}
+
+# ==================== 任务配置 ====================
+[task]
+# 连续截图多个问题时，每次截图都是独立的分析任务，可以同时进行
+
+# ◆ 同时进行的分析任务数，设为1则与旧版本一致，一次只处理一张截图
+max_concurrent = {task_max_concurrent}
+# ◆ 超出并发数时最多排队等待的任务数，队列满时新截图会被丢弃
+max_queued = {task_max_queued}
+# ◆ OCR与AI请求共用的后台线程数，即同时进行的外发请求上限，超出的请求排队等待
+max_workers = {task_max_workers}
+
+# ==================== 网络配置 ====================
+[network]
+# HTTP连接池设置，复用到OCR与AI端点的连接，省去每次请求的TCP/TLS握手
+
+# ◆ 连接池数量（每个端点一个连接池）
+pool_connections = {network_pool_connections}
+# ◆ 每个连接池保持的最大连接数
+pool_maxsize = {network_pool_maxsize}
+# ◆ 加载配置后是否预先建立到各端点的空闲连接
+prewarm = {network_prewarm}
+# ◆ 网络引擎：requests(默认，每个请求占用一个后台线程)、asyncio(单个事件循环驱动所有AI请求)
+#   asyncio引擎需要安装 httpx，未安装时自动回退到requests
+engine = "{network_engine}"
+# ◆ asyncio引擎是否启用HTTP/2，同一端点的并发请求复用一条连接（需安装 h2）
+http2 = {network_http2}
+
+# ==================== 内置服务配置 ====================
+[server]
+# 内置AI代理服务（端口58888）的运行方式，安装 waitress 后使用生产级多线程服务器
+
+# ◆ 运行方式：wsgi 多线程服务器；asgi 单个事件循环处理所有流式回答，客户端断开时立即中止上游请求（需安装 httpx 和 uvicorn）
+mode = "{server_mode}"
+# ◆ 监听地址：127.0.0.1 仅本机使用；0.0.0.0 可供局域网内其他电脑共用
+host = "{server_host}"
+# ◆ 工作线程数，即同时处理的请求数，流式回答会占用线程直到结束
+threads = {server_threads}
+# ◆ 空闲的keep-alive连接保持时间(秒)
+keepalive_timeout = {server_keepalive_timeout}
+
+# ==================== 缓存配置 ====================
+[cache]
+# 识别结果缓存设置，重复截图相同内容时直接复用结果，不再请求网络
+
+# ◆ 缓存目录
+dir = "{cache_dir}"
+# ◆ 是否缓存OCR结果
+ocr_enabled = {cache_ocr_enabled}
+# ◆ OCR缓存最大条目数，超出时淘汰最久未使用的结果
+ocr_max_entries = {cache_ocr_max_entries}
+# ◆ OCR缓存最大占用空间(MB)
+ocr_max_size_mb = {cache_ocr_max_size_mb}
+
+# ◆ 近似截图复用：截图与之前的截图只差几个像素（例如选区边缘不同）时，复用之前的OCR文字或AI回答
+# - off: 关闭（默认）
+# - ask: 照常识别，同时提示是否改用上次结果
+# - auto: 自动使用上次结果
+near_duplicate = "{cache_near_duplicate}"
+# ◆ 感知哈希汉明距离阈值(0-64)，越小越严格
+# 题目版式相同、只有数字不同的截图可能被判为相似，不建议调大
+phash_threshold = {cache_phash_threshold}
+# ◆ 近似截图索引最大条目数
+phash_max_entries = {cache_phash_max_entries}
+
+# ◆ 是否缓存AI回答，相同模型、提示词和内容的问题直接返回上次的回答
+ai_enabled = {cache_ai_enabled}
+# ◆ AI回答缓存有效期(秒)
+ai_ttl_seconds = {cache_ai_ttl_seconds}
+# ◆ AI回答缓存最大条目数
+ai_max_entries = {cache_ai_max_entries}
+# ◆ 生成温度高于该值时不使用AI回答缓存（此时通常希望每次得到不同的回答）
+ai_max_temperature = {cache_ai_max_temperature}
 
 # ==================== 日志配置 ====================
 [logging]
@@ -373,6 +592,7 @@ content = "{prompt["content"]}"
             ai_temperature=config["ai_model"]["temperature"],
             ai_vision_support=str(config["ai_model"]["vision_support"]).lower(),
             ai_enable_streaming=str(config["ai_model"]["enable_streaming"]).lower(),
+            ai_max_image_pixels=config["ai_model"]["max_image_pixels"],
             prompts_section=prompts_section.strip(),
             ocr_type=config["ocr"]["type"],
             ocr_engine=config["ocr"]["engine"],
@@ -387,6 +607,24 @@ content = "{prompt["content"]}"
             vision_max_tokens=config["ocr"]["vision_model"]["max_tokens"],
             vision_temperature=config["ocr"]["vision_model"]["temperature"],
             vision_prompt=config["ocr"]["vision_model"]["prompt"],
+            vision_max_image_pixels=config["ocr"]["vision_model"]["max_image_pixels"],
+            preprocess_enabled=str(config["ocr"]["preprocess"]["enabled"]).lower(),
+            preprocess_engines=json.dumps(config["ocr"]["preprocess"]["engines"]),
+            preprocess_trim=str(config["ocr"]["preprocess"]["trim"]).lower(),
+            preprocess_invert_dark=str(config["ocr"]["preprocess"]["invert_dark"]).lower(),
+            preprocess_binarize_engines=json.dumps(config["ocr"]["preprocess"]["binarize_engines"]),
+            preprocess_upscale_below=config["ocr"]["preprocess"]["upscale_below"],
+            local_workers=config["ocr"]["local"]["workers"],
+            local_warmup=str(config["ocr"]["local"]["warmup"]).lower(),
+            local_timeout=config["ocr"]["local"]["timeout"],
+            race_engines=json.dumps(config["ocr"]["race"]["engines"]),
+            race_hedged=str(config["ocr"]["race"]["hedged"]).lower(),
+            race_hedge_delay_ms=config["ocr"]["race"]["hedge_delay_ms"],
+            race_min_confidence=config["ocr"]["race"]["min_confidence"],
+            tiling_enabled=str(config["ocr"]["tiling"]["enabled"]).lower(),
+            tiling_max_tile_height=config["ocr"]["tiling"]["max_tile_height"],
+            tiling_overlap=config["ocr"]["tiling"]["overlap"],
+            tiling_workers=config["ocr"]["tiling"]["workers"],
             notification_type=config["notification"]["type"],
             smtp_server=config["notification"]["smtp"]["server"],
             smtp_port=config["notification"]["smtp"]["port"],
@@ -396,6 +634,31 @@ content = "{prompt["content"]}"
             hotkey_screenshot=config["hotkey"]["screenshot"],
             screenshot_quality=config["screenshot"]["quality"],
             screenshot_format=config["screenshot"]["format"],
+            screenshot_speculative_ocr=str(config["screenshot"]["speculative_ocr"]).lower(),
+            screenshot_speculative_delay_ms=config["screenshot"]["speculative_delay_ms"],
+            task_max_concurrent=config["task"]["max_concurrent"],
+            task_max_queued=config["task"]["max_queued"],
+            task_max_workers=config["task"]["max_workers"],
+            network_pool_connections=config["network"]["pool_connections"],
+            network_pool_maxsize=config["network"]["pool_maxsize"],
+            network_prewarm=str(config["network"]["prewarm"]).lower(),
+            network_engine=config["network"]["engine"],
+            network_http2=str(config["network"]["http2"]).lower(),
+            server_mode=config["server"]["mode"],
+            server_host=config["server"]["host"],
+            server_threads=config["server"]["threads"],
+            server_keepalive_timeout=config["server"]["keepalive_timeout"],
+            cache_dir=config["cache"]["dir"],
+            cache_ocr_enabled=str(config["cache"]["ocr_enabled"]).lower(),
+            cache_ocr_max_entries=config["cache"]["ocr_max_entries"],
+            cache_ocr_max_size_mb=config["cache"]["ocr_max_size_mb"],
+            cache_near_duplicate=config["cache"]["near_duplicate"],
+            cache_phash_threshold=config["cache"]["phash_threshold"],
+            cache_phash_max_entries=config["cache"]["phash_max_entries"],
+            cache_ai_enabled=str(config["cache"]["ai_enabled"]).lower(),
+            cache_ai_ttl_seconds=config["cache"]["ai_ttl_seconds"],
+            cache_ai_max_entries=config["cache"]["ai_max_entries"],
+            cache_ai_max_temperature=config["cache"]["ai_max_temperature"],
             logging_level=config["logging"]["level"]
         )
         
@@ -572,40 +835,541 @@ class ErrorHandler:
 
 
 class TaskManager(QObject):
-    """任务管理器"""
+    """任务管理器
+
+    每次截图分析是一个独立任务，最多同时运行 max_concurrent 个，
+    超出的任务进入等待队列（最多 max_queued 个），有任务结束时按顺序启动。
+    """
     
-    task_started = pyqtSignal()
-    task_finished = pyqtSignal()
+    task_started = pyqtSignal(int)   # 任务开始信号 (任务ID)
+    task_finished = pyqtSignal(int)  # 任务结束信号 (任务ID)
+    queue_changed = pyqtSignal()     # 运行中或等待中的任务数量变化信号
     
-    def __init__(self):
+    def __init__(self, max_concurrent: int = 1, max_queued: int = 0):
         super().__init__()
-        self._is_running = False
-        self._current_task = None
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self._next_id = 1
+        self._running: Dict[int, str] = {}
+        self._pending = deque()  # (任务ID, 任务名称, 启动回调)
+    
+    def configure(self, max_concurrent: int, max_queued: int):
+        """调整并发数和队列长度，已在运行的任务不受影响"""
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queued = max(0, int(max_queued))
+        self._start_pending()
     
     def is_running(self) -> bool:
         """检查是否有任务在运行"""
-        return self._is_running
+        return bool(self._running)
     
-    def start_task(self, task_name: str) -> bool:
-        """开始任务"""
-        if self._is_running:
-            logging.warning(f"任务 {self._current_task} 正在运行，无法启动新任务 {task_name}")
-            return False
+    def can_accept(self) -> bool:
+        """检查是否还能接受新任务（有空位或队列未满）"""
+        return len(self._running) < self.max_concurrent or len(self._pending) < self.max_queued
+    
+    def start_task(self, task_name: str, callback: Callable[[int], None]) -> Optional[int]:
+        """提交任务，有空位时立即以任务ID调用callback，否则排队；队列已满时返回None"""
+        if not self.can_accept():
+            logging.warning(f"任务队列已满（运行中 {len(self._running)}，等待中 {len(self._pending)}），无法启动新任务 {task_name}")
+            return None
         
-        self._is_running = True
-        self._current_task = task_name
-        self.task_started.emit()
-        logging.info(f"任务开始: {task_name}")
-        return True
-    
-    def finish_task(self):
-        """完成任务"""
-        if self._is_running:
-            logging.info(f"任务完成: {self._current_task}")
-            self._is_running = False
-            self._current_task = None
-            self.task_finished.emit()
+        task_id = self._next_id
+        self._next_id += 1
+        self._pending.append((task_id, task_name, callback))
+        if len(self._running) >= self.max_concurrent:
+            logging.info(f"任务排队: {task_name} #{task_id}")
+        self._start_pending()
+        self.queue_changed.emit()
+        return task_id
+    
+    def _start_pending(self):
+        """有空位时按顺序启动等待中的任务"""
+        while self._pending and len(self._running) < self.max_concurrent:
+            task_id, task_name, callback = self._pending.popleft()
+            self._running[task_id] = task_name
+            self.task_started.emit(task_id)
+            logging.info(f"任务开始: {task_name} #{task_id}")
+            try:
+                callback(task_id)
+            except Exception as e:
+                logging.error(f"任务启动失败: {task_name} #{task_id}: {e}")
+                self.finish_task(task_id)
+    
+    def finish_task(self, task_id: int):
+        """完成任务，空出的位置交给等待中的任务"""
+        task_name = self._running.pop(task_id, None)
+        if task_name is None:
+            return
+        logging.info(f"任务完成: {task_name} #{task_id}")
+        self.task_finished.emit(task_id)
+        self._start_pending()
+        self.queue_changed.emit()
+    
+    def cancel_task(self, task_id: int) -> bool:
+        """取消任务：等待中的直接移出队列，运行中的视为结束"""
+        for item in self._pending:
+            if item[0] == task_id:
+                self._pending.remove(item)
+                logging.info(f"任务已取消: {item[1]} #{task_id}")
+                self.queue_changed.emit()
+                return True
+        if task_id in self._running:
+            self.finish_task(task_id)
+            return True
+        return False
+    
+    def is_pending(self, task_id: int) -> bool:
+        """检查任务是否在等待队列中"""
+        return any(item[0] == task_id for item in self._pending)
+    
+    def running_tasks(self) -> List[int]:
+        """获取运行中的任务ID，按启动顺序排列"""
+        return list(self._running)
+    
+    def pending_tasks(self) -> List[int]:
+        """获取等待中的任务ID，按排队顺序排列"""
+        return [item[0] for item in self._pending]
+    
+    def pending_count(self) -> int:
+        """获取等待中的任务数量"""
+        return len(self._pending)
     
     def get_current_task(self) -> Optional[str]:
-        """获取当前任务名称"""
-        return self._current_task
\ No newline at end of file
+        """获取最近启动的任务名称"""
+        return next(reversed(self._running.values()), None) if self._running else None
+
+
+class TaskExecutor(QObject):
+    """共享的后台任务执行器（进程级单例）
+
+    OCR和AI请求都提交到同一个有界线程池，复用工作线程，同时进行的外发请求总数不超过 max_workers。
+    一个任务内部并发的请求（OCR分块、引擎竞速）通过 outbound_slot() 占用同一额度。
+    任务结果经由唯一的派发信号回到界面线程执行回调。首次获取实例须在界面线程中进行。
+    """
+    
+    _dispatched = pyqtSignal(object)  # 派发到界面线程执行的回调
+    
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, max_workers: int = 6):
+        super().__init__()
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._outbound = 0  # 占用中的外发请求额度
+        self._outbound_condition = threading.Condition(self._lock)
+        # 始终排队执行，即使在界面线程中派发也不会重入调用方
+        self._dispatched.connect(self._run_dispatched, Qt.ConnectionType.QueuedConnection)
+    
+    @classmethod
+    def instance(cls) -> "TaskExecutor":
+        """获取全局唯一实例"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+    
+    def configure(self, max_workers: int):
+        """调整工作线程数，变化时新任务提交到新线程池，旧线程池中的任务继续完成"""
+        max_workers = max(1, int(max_workers))
+        with self._lock:
+            if max_workers == self.max_workers:
+                return
+            self.max_workers = max_workers
+            executor, self._executor = self._executor, None
+            self._outbound_condition.notify_all()
+        if executor is not None:
+            executor.shutdown(wait=False)
+        logging.info(f"任务执行器工作线程数调整为 {max_workers}")
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """获取线程池，不存在时创建"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="task")
+            return self._executor
+    
+    def submit(self, fn: Callable, *args, on_success: Optional[Callable[[Any], None]] = None,
+               on_failure: Optional[Callable[[Exception], None]] = None, **kwargs) -> Future:
+        """提交任务，返回Future；on_success/on_failure 在界面线程中以结果/异常调用"""
+        with self._lock:
+            self._queued += 1
+        future = self._get_executor().submit(self._run, fn, args, kwargs)
+        future.add_done_callback(self._on_future_done)
+        if on_success or on_failure:
+            self.when_done(future, on_success, on_failure)
+        return future
+    
+    def _run(self, fn: Callable, args: tuple, kwargs: dict):
+        """在工作线程中执行任务并统计"""
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+    
+    @contextmanager
+    def outbound_slot(self, cancel_token: Optional["CancellationToken"] = None):
+        """占用一个外发请求额度，额度用完时等待；等待期间令牌被取消则抛出TaskCancelledError"""
+        with self._outbound_condition:
+            while self._outbound >= self.max_workers:
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
+                self._outbound_condition.wait(0.1)
+            self._outbound += 1
+        try:
+            yield
+        finally:
+            with self._outbound_condition:
+                self._outbound -= 1
+                self._outbound_condition.notify()
+    
+    def _on_future_done(self, future: Future):
+        """排队中被取消的任务不会执行，从排队数中扣除"""
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+    
+    def when_done(self, future: Future, on_success: Optional[Callable[[Any], None]] = None,
+                  on_failure: Optional[Callable[[Exception], None]] = None):
+        """future完成后在界面线程中调用回调，被取消的future不回调"""
+        def done(finished: Future):
+            if finished.cancelled():
+                return
+            error = finished.exception()
+            if error is None:
+                if on_success:
+                    self.dispatch(on_success, finished.result())
+            elif on_failure:
+                self.dispatch(on_failure, error)
+        
+        future.add_done_callback(done)
+    
+    def dispatch(self, callback: Callable, *args):
+        """在界面线程中调用callback，可在任意线程中使用"""
+        self._dispatched.emit(lambda: callback(*args))
+    
+    def _run_dispatched(self, callback: Callable):
+        """在界面线程中执行派发的回调"""
+        try:
+            callback()
+        except Exception as e:
+            logging.error(f"任务回调执行失败: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取队列深度和工作线程利用率"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": self._queued,
+                "completed": self._completed,
+                "outbound": self._outbound,
+                "utilization": min(1.0, self._active / self.max_workers)
+            }
+    
+    def shutdown(self):
+        """关闭线程池，排队中的任务直接取消"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class TaskCancelledError(Exception):
+    """任务已被取消"""
+    pass
+
+
+class CancellationToken:
+    """协作式取消令牌
+
+    执行方在各阶段之间检查令牌，网络请求把响应登记到令牌上；
+    取消时关闭已登记响应的底层socket，阻塞在读取上的线程会立即返回。
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._responses = []
+        self._callbacks = []
+    
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消"""
+        return self._event.is_set()
+    
+    def cancel(self):
+        """取消，不等待执行方结束"""
+        with self._lock:
+            self._event.set()
+            responses, self._responses = self._responses, []
+            callbacks, self._callbacks = self._callbacks, []
+        for response in responses:
+            self._abort(response)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.debug(f"取消回调执行失败: {e}")
+    
+    def raise_if_cancelled(self):
+        """已取消时抛出TaskCancelledError"""
+        if self._event.is_set():
+            raise TaskCancelledError("任务已取消")
+    
+    def register(self, response: requests.Response):
+        """登记进行中的响应，已取消时立即关闭"""
+        with self._lock:
+            if not self._event.is_set():
+                self._responses.append(response)
+                return
+        self._abort(response)
+    
+    def add_callback(self, callback: Callable[[], None]):
+        """登记取消时调用的回调（在调用cancel的线程中执行），已取消时立即调用"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+    
+    def remove_callback(self, callback: Callable[[], None]):
+        """取消登记回调"""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+    
+    @staticmethod
+    @contextmanager
+    def child_of(parent: Optional["CancellationToken"]):
+        """创建子令牌：父令牌取消时一并取消；离开作用域时子令牌被取消，仍在进行的子任务随之中断"""
+        child = CancellationToken()
+        if parent is not None:
+            parent.add_callback(child.cancel)
+        try:
+            yield child
+        finally:
+            if parent is not None:
+                parent.remove_callback(child.cancel)
+            child.cancel()
+    
+    def unregister(self, response: requests.Response):
+        """响应读取完毕后取消登记"""
+        with self._lock:
+            if response in self._responses:
+                self._responses.remove(response)
+    
+    @staticmethod
+    def _abort(response: requests.Response):
+        """关闭响应，先关闭底层socket，使其他线程中阻塞的读取立即出错返回"""
+        try:
+            # 开始读取响应体后socket已从连接上分离，由http.client的响应持有
+            sock = getattr(getattr(response.raw, "_connection", None), "sock", None)
+            if sock is None:
+                fp = getattr(getattr(response.raw, "_fp", None), "fp", None)
+                sock = getattr(getattr(fp, "raw", None), "_sock", None)
+            if sock is not None:
+                sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+        try:
+            response.close()
+        except Exception:
+            pass
+
+
+class HttpClientManager:
+    """HTTP客户端管理器（进程级单例，按端点复用连接池）"""
+    
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self):
+        self._sessions: Dict[str, requests.Session] = {}
+        self._in_flight: Dict[requests.Session, int] = {}  # 各会话上进行中的请求数
+        self._retired: List[requests.Session] = []  # 配置变化后被替换、等待进行中请求结束再关闭的会话
+        self._lock = threading.Lock()
+        self.pool_connections = 8
+        self.pool_maxsize = 16
+    
+    @classmethod
+    def instance(cls) -> "HttpClientManager":
+        """获取全局唯一实例"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+    
+    def configure(self, network_config: Optional[Dict[str, Any]]):
+        """根据网络配置调整连接池大小，配置变化时后续请求使用新连接池"""
+        network_config = network_config or {}
+        pool_connections = int(network_config.get("pool_connections", self.pool_connections))
+        pool_maxsize = int(network_config.get("pool_maxsize", self.pool_maxsize))
+        
+        if pool_connections == self.pool_connections and pool_maxsize == self.pool_maxsize:
+            return
+        
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._retire_all()
+        logging.info(f"HTTP连接池已配置: pool_connections={pool_connections}, pool_maxsize={pool_maxsize}")
+    
+    @staticmethod
+    def _endpoint_key(url: str) -> str:
+        """提取端点标识（协议+主机+端口）"""
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+    
+    def get_session(self, url: str) -> requests.Session:
+        """获取指定端点的会话，不存在时创建"""
+        key = self._endpoint_key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[key] = session
+                logging.debug(f"创建HTTP连接池: {key}")
+            return session
+    
+    def _checkout(self, url: str) -> requests.Session:
+        """获取会话并记录一个进行中的请求"""
+        session = self.get_session(url)
+        with self._lock:
+            self._in_flight[session] = self._in_flight.get(session, 0) + 1
+        return session
+    
+    def _checkin(self, session: requests.Session):
+        """请求结束；被替换的会话在最后一个请求结束后关闭"""
+        with self._lock:
+            self._in_flight[session] -= 1
+            if self._in_flight[session]:
+                return
+            del self._in_flight[session]
+            if session not in self._retired:
+                return
+            self._retired.remove(session)
+        session.close()
+    
+    def request(self, method: str, url: str, cancel_token: Optional[CancellationToken] = None,
+                **kwargs) -> requests.Response:
+        """通过连接池发送请求
+
+        传入cancel_token时响应会登记到令牌上，取消后读取响应体会立即中断并抛出TaskCancelledError。
+        stream=True 的响应由调用方读取完毕后自行调用 cancel_token.unregister 并关闭响应。
+        """
+        session = self._checkout(url)
+        try:
+            response = self._send(session, method, url, cancel_token, **kwargs)
+        except BaseException:
+            self._checkin(session)
+            raise
+        if not kwargs.get("stream", False):
+            self._checkin(session)
+            return response
+        
+        # 流式响应在调用方关闭时才算结束
+        close = response.close
+        def close_and_checkin():
+            try:
+                close()
+            finally:
+                # 去掉包装，重复关闭时只计一次
+                if response.__dict__.pop("close", None) is not None:
+                    self._checkin(session)
+        response.close = close_and_checkin
+        return response
+    
+    def _send(self, session: requests.Session, method: str, url: str,
+              cancel_token: Optional[CancellationToken], **kwargs) -> requests.Response:
+        """发送请求，传入cancel_token时在这里读完非流式响应的响应体"""
+        if cancel_token is None:
+            return session.request(method, url, **kwargs)
+        
+        cancel_token.raise_if_cancelled()
+        stream = kwargs.pop("stream", False)
+        response = session.request(method, url, stream=True, **kwargs)
+        cancel_token.register(response)
+        if stream:
+            return response
+        
+        try:
+            # 在这里读完响应体，读取过程可被取消
+            response.content
+        except (requests.exceptions.RequestException, OSError, AttributeError):
+            if cancel_token.cancelled:
+                raise TaskCancelledError("任务已取消")
+            raise
+        finally:
+            cancel_token.unregister(response)
+        cancel_token.raise_if_cancelled()
+        return response
+    
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """发送GET请求"""
+        return self.request("GET", url, **kwargs)
+    
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """发送POST请求"""
+        return self.request("POST", url, **kwargs)
+    
+    def prewarm(self, urls: Iterable[str], timeout: float = 5):
+        """在后台线程中预先建立到各端点的连接，使首个真实请求免去握手"""
+        endpoints = []
+        for url in urls:
+            if url and url.startswith(("http://", "https://")):
+                key = self._endpoint_key(url)
+                if key not in endpoints:
+                    endpoints.append(key)
+        
+        if not endpoints:
+            return
+        
+        def warm():
+            for endpoint in endpoints:
+                try:
+                    # 任意响应都会把已建立的连接放回连接池
+                    self.get_session(endpoint).head(endpoint + "/", timeout=timeout)
+                    logging.debug(f"连接预热成功: {endpoint}")
+                except requests.exceptions.RequestException as e:
+                    logging.debug(f"连接预热失败: {endpoint}: {e}")
+        
+        threading.Thread(target=warm, daemon=True).start()
+    
+    def _retire_all(self):
+        """替换所有连接池：空闲的立即关闭，有进行中请求的等请求结束后关闭"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            idle = [session for session in sessions if not self._in_flight.get(session)]
+            self._retired.extend(session for session in sessions if self._in_flight.get(session))
+        for session in idle:
+            session.close()
+    
+    def close_all(self):
+        """关闭所有连接池"""
+        with self._lock:
+            sessions = list(self._sessions.values()) + self._retired
+            self._sessions.clear()
+            self._retired = []
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                pass